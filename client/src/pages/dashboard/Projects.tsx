@@ -36,8 +36,15 @@ export default function Projects() {
 
     const fetchProjects = async () => {
         try {
-            const { data } = await api.get('/projects');
-            setProjects(data);
+            // GET /projects is paged: follow X-Next-Cursor until the last page
+            const allProjects: any[] = [];
+            let cursor: string | undefined;
+            do {
+                const response = await api.get('/projects', { params: { limit: 200, cursor } });
+                allProjects.push(...response.data);
+                cursor = response.headers['x-next-cursor'] as string | undefined;
+            } while (cursor);
+            setProjects(allProjects);
         } catch (error) {
             console.error("Failed to fetch projects", error);
         }
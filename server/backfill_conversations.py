@@ -0,0 +1,54 @@
+"""
+One-off backfill of the `conversations` summaries from existing messages.
+
+New messages maintain their room's summary as they are written; run this once
+after deploying so chats that predate the summaries show up in /messages/contacts:
+
+    python backfill_conversations.py
+"""
+from core.firebase_config import db
+
+BATCH_SIZE = 400
+
+
+def backfill():
+    latest = {}
+    for doc in db.collection("messages").stream():
+        msg = doc.to_dict()
+        room = msg.get("room")
+        timestamp = msg.get("timestamp")
+        if not room or not timestamp:
+            continue
+        if room not in latest or timestamp > latest[room]["timestamp"]:
+            latest[room] = msg
+
+    batch = db.batch()
+    pending = 0
+    for room, msg in latest.items():
+        participants = {p for p in (msg.get("senderId"), msg.get("receiverId")) if p and p != "system"}
+        # Rooms are "<uid>_<uid>"; this recovers the other side of system messages
+        room_ids = room.split("_")
+        if len(room_ids) == 2:
+            participants.update(room_ids)
+        batch.set(db.collection("conversations").document(room), {
+            "room": room,
+            "participants": sorted(participants),
+            "lastMessage": {
+                "content": msg.get("content", ""),
+                "timestamp": msg.get("timestamp"),
+                "senderId": msg.get("senderId"),
+            },
+            "lastMessageAt": msg.get("timestamp"),
+        }, merge=True)
+        pending += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    print(f"Backfilled {len(latest)} conversations")
+
+
+if __name__ == "__main__":
+    backfill()
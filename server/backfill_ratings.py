@@ -0,0 +1,42 @@
+"""
+One-off migration of the legacy `ratings` arrays on user documents.
+
+Each rating moves to users/{uid}/ratings/{raterId} and the user document gets
+ratingSum/ratingCount in place of the array. Users who are rated again are
+migrated on the fly, so this only clears the arrays off everyone else:
+
+    python backfill_ratings.py
+"""
+from datetime import datetime
+
+from firebase_admin import firestore
+
+from core.firebase_config import db
+from core.ratings import RATINGS_SUBCOLLECTION
+
+
+def backfill():
+    migrated = 0
+    for doc in db.collection("users").select(["ratings"]).stream():
+        legacy = doc.to_dict().get("ratings")
+        if legacy is None:
+            continue
+        scores = {r["raterId"]: r.get("score", 0) for r in legacy if r.get("raterId")}
+        batch = db.batch()
+        now = datetime.now()
+        for rater_id, score in scores.items():
+            batch.set(doc.reference.collection(RATINGS_SUBCOLLECTION).document(rater_id), {
+                "raterId": rater_id, "score": score, "updatedAt": now
+            })
+        batch.update(doc.reference, {
+            "ratings": firestore.DELETE_FIELD,
+            "ratingSum": float(sum(scores.values())),
+            "ratingCount": len(scores),
+        })
+        batch.commit()
+        migrated += 1
+    print(f"Migrated ratings for {migrated} users")
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,74 @@
+"""
+One-off backfill of the per-user stat counters from existing data.
+
+Sessions, matches, projects and messages keep messageCount, completedSessions,
+projectCount and dailyCounts up to date as they are written; run this once
+after deploying so users with earlier activity start from the right totals:
+
+    python backfill_user_stats.py
+"""
+from collections import Counter, defaultdict
+
+from core.firebase_config import db
+from core.user_stats import CONFIRMED_SESSION_STATUSES, day_key
+
+BATCH_SIZE = 400
+
+
+def backfill():
+    message_counts = Counter()
+    for doc in db.collection("messages").select(["senderId"]).stream():
+        sender_id = doc.to_dict().get("senderId")
+        if sender_id and sender_id != "system":
+            message_counts[sender_id] += 1
+
+    completed = Counter()
+    daily = defaultdict(lambda: defaultdict(Counter))
+    for doc in db.collection("sessions").select(["teacherId", "learnerId", "status", "scheduledAt"]).stream():
+        session = doc.to_dict()
+        participants = {session.get("teacherId"), session.get("learnerId")} - {None}
+        if session.get("status") == "COMPLETED":
+            completed.update(participants)
+        day = day_key(session.get("scheduledAt"))
+        if session.get("status") in CONFIRMED_SESSION_STATUSES and day:
+            for uid in participants:
+                daily[uid][day]["sessions"] += 1
+
+    for doc in db.collection("matches").select(["user1Id", "user2Id", "createdAt"]).stream():
+        match = doc.to_dict()
+        day = day_key(match.get("createdAt"))
+        if not day:
+            continue
+        for uid in {match.get("user1Id"), match.get("user2Id")} - {None}:
+            daily[uid][day]["matches"] += 1
+
+    project_counts = Counter()
+    for doc in db.collection("projects").select(["memberIds"]).stream():
+        project_counts.update(set(doc.to_dict().get("memberIds", [])))
+
+    # Only today and later are ever read; older days would just be pruned again
+    today = day_key()
+    batch = db.batch()
+    pending = 0
+    users = 0
+    for doc in db.collection("users").select([]).stream():
+        uid = doc.id
+        batch.set(doc.reference, {
+            "messageCount": message_counts[uid],
+            "completedSessions": completed[uid],
+            "projectCount": project_counts[uid],
+            "dailyCounts": {day: dict(kinds) for day, kinds in daily[uid].items() if day >= today},
+        }, merge=True)
+        users += 1
+        pending += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    print(f"Backfilled stat counters for {users} users")
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,273 @@
+"""
+Micro-benchmark: precompiled email templates vs. the f-string methods they replaced.
+
+"before" is EmailService as it was before email_templates.py, kept verbatim
+below except that send_project_invitation returns the subject and HTML
+instead of sending them: f-strings that rebuild the multi-kilobyte shell on
+every send and escape nothing. "precompiled" is
+email_templates.PROJECT_INVITATION. Both must produce the same markup
+(indentation aside) for the sample project, which has nothing to escape.
+
+Usage: python benchmark_email_templates.py [iterations]
+"""
+import sys
+import timeit
+
+import email_templates as templates
+
+PROJECT = {
+    "title": "Realtime Whiteboard",
+    "description": "Collaborative canvas with live cursors and undo history",
+    "stack": ["React", "FastAPI", "Socket.IO", "Redis"],
+    "difficulty": "Advanced",
+    "type": "Web Development",
+}
+
+
+class EmailServiceBefore:
+    def _get_base_template(self, content: str) -> str:
+        """Base template with SkillShare sketch theme"""
+        return f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <link href="https://fonts.googleapis.com/css2?family=Caveat:wght@400;700&family=Inter:wght@400;600;700&display=swap" rel="stylesheet">
+            <style>
+                * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+                body {{ 
+                    font-family: 'Inter', Arial, sans-serif; 
+                    background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+                    padding: 20px;
+                }}
+                .email-container {{ 
+                    max-width: 600px; 
+                    margin: 0 auto; 
+                    background: white;
+                    border: 3px solid #1a1a1a;
+                    box-shadow: 8px 8px 0px #1a1a1a;
+                    position: relative;
+                }}
+                .tape {{ 
+                    position: absolute;
+                    width: 80px;
+                    height: 25px;
+                    background: rgba(255, 220, 100, 0.7);
+                    border: 1px solid rgba(0,0,0,0.1);
+                    top: -12px;
+                    left: 50%;
+                    transform: translateX(-50%) rotate(-2deg);
+                    z-index: 10;
+                }}
+                .header {{ 
+                    background: linear-gradient(135deg, #FFE66D 0%, #FFC93C 100%);
+                    padding: 40px 30px;
+                    border-bottom: 3px solid #1a1a1a;
+                    position: relative;
+                    overflow: hidden;
+                }}
+                .header::before {{
+                    content: '';
+                    position: absolute;
+                    top: 0;
+                    left: 0;
+                    right: 0;
+                    bottom: 0;
+                    background: repeating-linear-gradient(
+                        45deg,
+                        transparent,
+                        transparent 10px,
+                        rgba(255,255,255,0.1) 10px,
+                        rgba(255,255,255,0.1) 20px
+                    );
+                }}
+                .header h1 {{ 
+                    font-family: 'Caveat', cursive;
+                    font-size: 48px;
+                    color: #1a1a1a;
+                    text-align: center;
+                    transform: rotate(-2deg);
+                    position: relative;
+                    z-index: 1;
+                    text-shadow: 3px 3px 0px rgba(255,255,255,0.5);
+                }}
+                .content {{ 
+                    padding: 40px 30px;
+                    background: #FFFEF9;
+                }}
+                .content h2 {{
+                    font-family: 'Caveat', cursive;
+                    font-size: 32px;
+                    color: #1a1a1a;
+                    margin-bottom: 20px;
+                    transform: rotate(-1deg);
+                }}
+                .content p {{
+                    font-size: 16px;
+                    line-height: 1.8;
+                    color: #333;
+                    margin-bottom: 15px;
+                }}
+                .card {{
+                    background: white;
+                    border: 3px solid #1a1a1a;
+                    padding: 25px;
+                    margin: 25px 0;
+                    box-shadow: 4px 4px 0px #1a1a1a;
+                    transform: rotate(-1deg);
+                }}
+                .card h3 {{
+                    font-family: 'Caveat', cursive;
+                    font-size: 28px;
+                    color: #1a1a1a;
+                    margin-bottom: 15px;
+                }}
+                .button {{
+                    display: inline-block;
+                    padding: 15px 35px;
+                    background: #6C63FF;
+                    color: white !important;
+                    text-decoration: none;
+                    font-weight: 700;
+                    font-size: 18px;
+                    border: 3px solid #1a1a1a;
+                    box-shadow: 4px 4px 0px #1a1a1a;
+                    transform: rotate(-1deg);
+                    transition: all 0.2s;
+                    margin: 20px 0;
+                    font-family: 'Caveat', cursive;
+                }}
+                .button:hover {{
+                    transform: rotate(-1deg) translateY(-2px);
+                    box-shadow: 6px 6px 0px #1a1a1a;
+                }}
+                .badge {{
+                    display: inline-block;
+                    padding: 8px 15px;
+                    background: #FFE66D;
+                    border: 2px solid #1a1a1a;
+                    font-weight: 700;
+                    font-size: 14px;
+                    margin: 5px;
+                    transform: rotate(1deg);
+                    box-shadow: 2px 2px 0px #1a1a1a;
+                }}
+                .footer {{
+                    background: #f5f5f5;
+                    padding: 30px;
+                    text-align: center;
+                    border-top: 3px solid #1a1a1a;
+                    font-size: 14px;
+                    color: #666;
+                }}
+                .emoji {{
+                    font-size: 32px;
+                    display: inline-block;
+                    animation: bounce 2s infinite;
+                }}
+                @keyframes bounce {{
+                    0%, 100% {{ transform: translateY(0); }}
+                    50% {{ transform: translateY(-10px); }}
+                }}
+                ul {{
+                    list-style: none;
+                    padding-left: 0;
+                }}
+                ul li {{
+                    padding: 10px 0;
+                    font-size: 16px;
+                    position: relative;
+                    padding-left: 30px;
+                }}
+                ul li:before {{
+                    content: '✏️';
+                    position: absolute;
+                    left: 0;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="email-container">
+                <div class="tape"></div>
+                {content}
+            </div>
+        </body>
+        </html>
+        """
+
+    def send_project_invitation(self, project_data: dict, invitee_email: str, invitee_name: str, inviter_name: str):
+        """Send project invitation email"""
+        subject = f"Project Invite: {project_data.get('title')} 🚀"
+        
+        tech_badges = ''.join([f'<span class="badge">{tech}</span>' for tech in project_data.get('stack', [])])
+        
+        content = f"""
+        <div class="header">
+            <h1>Project Invitation! <span class="emoji">🚀</span></h1>
+        </div>
+        <div class="content">
+            <h2>Hey {invitee_name}!</h2>
+            <p><strong>{inviter_name}</strong> thinks you'd be perfect for their project! 🎯</p>
+            
+            <div class="card">
+                <h3>{project_data.get('title')}</h3>
+                <p>{project_data.get('description')}</p>
+                
+                <p style="margin-top: 20px;"><strong>Tech Stack:</strong></p>
+                <div>{tech_badges}</div>
+                
+                <p style="margin-top: 15px;">
+                    <strong>Difficulty:</strong> <span class="badge">{project_data.get('difficulty', 'Intermediate')}</span>
+                    <strong>Type:</strong> <span class="badge">{project_data.get('type', 'Web Development')}</span>
+                </p>
+            </div>
+            
+            <center>
+                <a href="http://localhost:5173/dashboard/projects" class="button">View Project →</a>
+            </center>
+            
+            <p style="margin-top: 30px;">Join now and start building something awesome together! 💪</p>
+            <p><strong>Happy Building,<br>The SkillShare Team</strong></p>
+        </div>
+        <div class="footer">
+            <p>© 2026 SkillShare • Building skills together, one session at a time</p>
+        </div>
+        """
+        
+        html_content = self._get_base_template(content)
+        return subject, html_content
+
+
+def before_invitation(invitee_name, inviter_name, project):
+    _, html_content = EmailServiceBefore().send_project_invitation(
+        project, "invitee@example.com", invitee_name, inviter_name)
+    return html_content
+
+
+def compiled_invitation(invitee_name, inviter_name, project):
+    return templates.PROJECT_INVITATION.render(
+        invitee_name=invitee_name,
+        inviter_name=inviter_name,
+        title=project["title"],
+        description=project["description"],
+        tech_badges=templates.badges(project["stack"]),
+        difficulty=project["difficulty"],
+        type=project["type"],
+    )
+
+
+def same_markup(a, b):
+    return a.split() == b.split()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    assert same_markup(before_invitation("Ada", "Linus", PROJECT), compiled_invitation("Ada", "Linus", PROJECT))
+    for label, fn in (("before", before_invitation), ("precompiled", compiled_invitation)):
+        seconds = min(timeit.repeat(lambda: fn("Ada", "Linus", PROJECT), number=iterations, repeat=5))
+        print(f"{label:>12}: {iterations / seconds:>10,.0f} renders/s  ({seconds / iterations * 1e6:.2f} µs each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Micro-benchmark: create_project invitation fan-out, per-invitee writes vs. one batched commit.
+
+Runs the real create_project handler against the in-memory Firestore from
+tests/fake_firestore.py, which blocks for a fixed latency on every
+round-trip, and a Socket.IO server stand-in whose emits wait for one publish
+to the message queue. "batched" is main.create_project as shipped: one
+projected read of owner and invitees, every invitation on one commit, the
+emits gathered through the Notifier and the emails queued to the outbox.
+"serial" is the handler as it was before, kept verbatim below: record_message
+and two sequential emits per invitee, then a blocking bulk email send.
+
+The user card cache is cleared before every project. The index refreshes a
+write schedules are drained, untimed, before the next project; the reported
+round-trips include them.
+
+Usage: python benchmark_project_invites.py [latency_ms] [invitees ...]
+"""
+import asyncio
+import logging
+import sys
+import time
+import types
+import uuid
+from datetime import datetime
+
+from tests.fake_firestore import FakeFirestore
+
+client = FakeFirestore(latency=0.005)
+sys.modules["core.firebase_config"] = types.SimpleNamespace(db=client)
+
+import main as server  # noqa: E402
+import skillshare_data_models  # noqa: E402
+from core import user_stats  # noqa: E402
+from core.conversations import record_message  # noqa: E402
+from core.notifier import Notifier  # noqa: E402
+from core.repositories import projects_repo, users_repo  # noqa: E402
+from core.user_cards import user_cards  # noqa: E402
+from main import HTTPException, invalidate_user_cache, logger  # noqa: E402
+
+OWNER = "owner"
+
+
+class FakeServer:
+    """AsyncServer stand-in: each emit waits for one publish to the message queue."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.manager = types.SimpleNamespace(get_participants=lambda namespace, rooms: [])
+
+    async def emit(self, event, data, to=None, room=None, skip_sid=None, namespace=None):
+        await asyncio.sleep(self.latency)
+
+
+class BlockingEmail:
+    """EmailService before the outbox: the bulk SendGrid request runs inside the handler."""
+
+    def send_project_invitations(self, project_data, invitees, owner_name):
+        time.sleep(client.latency)
+        return len(invitees)
+
+
+class QueuedEmail:
+    """EmailService with the outbox attached: the send is queued and the handler moves on."""
+
+    def send_project_invitations(self, project_data, invitees, owner_name):
+        return len(invitees)
+
+
+sio = FakeServer(0.001)
+email_service = BlockingEmail()
+server.notifier = Notifier(sio)
+server.email_service = QueuedEmail()
+
+
+async def get_cached_users(user_ids):
+    return {doc.id: doc.to_dict() for doc in await users_repo.get_many(user_ids) if doc.exists}
+
+
+async def create_project_before(project: skillshare_data_models.Project, current_user_id: str):
+    # Override owner with current user
+    user_doc = await users_repo.get(current_user_id)
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    u_data = user_doc.to_dict()
+    project.ownerName = u_data.get("name", "Unknown")
+    project.ownerId = current_user_id
+    project.id = str(uuid.uuid4())
+
+    # Store initial invited members as pending
+    invited_ids = project.memberIds
+    project.memberIds = [current_user_id]
+    project.pendingMemberIds = [uid for uid in invited_ids if uid != current_user_id]
+
+    # Fetch owner details for memberDetails
+    project.memberDetails = [{
+        "id": current_user_id,
+        "name": u_data.get("name", "User"),
+        "avatar": u_data.get("avatar")
+    }]
+
+    # Send invitations via Chat
+    for invitee_id in project.pendingMemberIds:
+        room = "_".join(sorted([current_user_id, invitee_id]))
+        invite_msg = {
+            "senderId": current_user_id,
+            "receiverId": invitee_id,
+            "content": f"🚀 **Project Invite!**\nI've invited you to join my project: **{project.title}**.",
+            "timestamp": datetime.now(),
+            "read": False,
+            "room": room,
+            "type": "project_invite",
+            "isRequest": True,
+            "projectId": project.id
+        }
+        await record_message(invite_msg, [current_user_id, invitee_id])
+
+        # Real-time notification to the room (so sender sees it)
+        await sio.emit("receive_message", {
+            **invite_msg,
+            "timestamp": invite_msg["timestamp"].isoformat()
+        }, room=room)
+
+        # Real-time notification to invitee's personal room
+        await sio.emit("receive_message", {
+            **invite_msg,
+            "timestamp": invite_msg["timestamp"].isoformat()
+        }, room=invitee_id)
+
+    # Send project invitation emails: one profile read and one bulk send for all invitees
+    if email_service and project.pendingMemberIds:
+        try:
+            invitees = await get_cached_users(project.pendingMemberIds)
+            email_project_data = {
+                "title": project.title,
+                "description": project.description,
+                "stack": project.stack,
+                "difficulty": project.difficulty,
+                "type": project.type
+            }
+            sent = email_service.send_project_invitations(
+                email_project_data,
+                [{"email": data.get("email"), "name": data.get("name")} for data in invitees.values()],
+                u_data.get("name")
+            )
+            logger.info(f"Project invitation emails sent to {sent} invitees")
+        except Exception as e:
+            logger.error(f"Failed to send project invitation emails: {e}")
+            # Don't fail project creation if email fails
+
+    # Adjust spots (only confirmed members count)
+    project.spots = max(0, project.totalSpots - len(project.memberIds))
+
+    await projects_repo.set(project.id, project.dict())
+    await user_stats.increment([current_user_id], counters={"projectCount": 1})
+    invalidate_user_cache(current_user_id)
+
+    return project
+
+
+def seed(invitees):
+    for uid in [OWNER] + [f"user-{i}" for i in range(invitees)]:
+        client.docs[f"users/{uid}"] = {"name": f"User {uid}", "email": f"{uid}@example.com"}
+
+
+def new_project(invitees):
+    return skillshare_data_models.Project(
+        title="Benchmark", description="Invitation fan-out", stack=["Python"], type="Web App",
+        difficulty="Beginner", spots=invitees, totalSpots=invitees + 1, ownerId=OWNER, ownerName="",
+        memberIds=[f"user-{i}" for i in range(invitees)],
+    )
+
+
+async def drain():
+    """Wait for the index refreshes the handler scheduled in the background."""
+    while pending := asyncio.all_tasks() - {asyncio.current_task()}:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def measure(handler, invitees, rounds=5):
+    elapsed = 0.0
+    round_trips = 0
+    for _ in range(rounds):
+        user_cards.cache.clear()
+        before = client.round_trips
+        started = time.perf_counter()
+        await handler(new_project(invitees), OWNER)
+        elapsed += time.perf_counter() - started
+        await drain()
+        round_trips += client.round_trips - before
+    return elapsed / rounds, round_trips / rounds
+
+
+async def run(invitee_counts):
+    for invitees in invitee_counts:
+        seed(invitees)
+        for label, handler in (("serial", create_project_before), ("batched", server.create_project)):
+            seconds, round_trips = await measure(handler, invitees)
+            print(f"{invitees:>4} invitees {label:>8}: {seconds * 1000:>9.2f} ms per project  "
+                  f"({round_trips:.0f} Firestore round-trips)")
+
+
+def main():
+    client.latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 5.0) / 1000
+    invitee_counts = [int(n) for n in sys.argv[2:]] or [1, 10, 50]
+    logging.disable(logging.INFO)
+    print(f"Simulated round-trip: {client.latency * 1000:.1f} ms, emit: {sio.latency * 1000:.1f} ms")
+    asyncio.run(run(invitee_counts))
+
+
+if __name__ == "__main__":
+    main()
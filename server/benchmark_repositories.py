@@ -0,0 +1,69 @@
+"""
+Micro-benchmark: concurrent request throughput, blocking Firestore calls vs. the repository layer.
+
+The in-memory Firestore from tests/fake_firestore.py stands in for the
+client, blocking the calling thread for a fixed latency on every round-trip
+as the real gRPC client does.
+"blocking" is what handlers did before core.repositories: call the client
+directly inside `async def`, stalling the event loop for every round-trip.
+"repository" awaits the same reads through Repository/run_blocking, so
+concurrent requests overlap on the managed executor.
+
+Usage: python benchmark_repositories.py [latency_ms] [concurrency ...]
+"""
+import asyncio
+import sys
+import time
+import types
+
+from tests.fake_firestore import FakeFirestore
+
+
+client = FakeFirestore(latency=0.005)
+sys.modules["core.firebase_config"] = types.SimpleNamespace(db=client)
+
+from core.repositories import sessions_repo, users_repo  # noqa: E402
+
+
+def seed(count):
+    for i in range(count):
+        client.docs[f"users/user-{i}"] = {"name": f"User {i}", "xp": 120}
+        client.docs[f"sessions/user-{i}"] = {"teacherId": f"user-{i}", "duration": 60}
+
+
+async def blocking_handler(user_id):
+    # Two sequential round-trips on the event loop thread, as in the old handlers
+    user = client.collection("users").document(user_id).get()
+    session = client.collection("sessions").document(user_id).get()
+    return user.to_dict(), session.to_dict()
+
+
+async def repository_handler(user_id):
+    user, session = await asyncio.gather(users_repo.get(user_id), sessions_repo.get(user_id))
+    return user.to_dict(), session.to_dict()
+
+
+async def throughput(handler, concurrency, rounds=5):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(handler(f"user-{i}") for i in range(concurrency)))
+    return concurrency * rounds / (time.perf_counter() - started)
+
+
+async def run(concurrencies):
+    for concurrency in concurrencies:
+        for label, handler in (("blocking", blocking_handler), ("repository", repository_handler)):
+            rate = await throughput(handler, concurrency)
+            print(f"{concurrency:>5} concurrent {label:>10}: {rate:>10,.0f} requests/s")
+
+
+def main():
+    client.latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 5.0) / 1000
+    concurrencies = [int(n) for n in sys.argv[2:]] or [1, 10, 50, 100]
+    seed(max(concurrencies))
+    print(f"Simulated Firestore round-trip: {client.latency * 1000:.1f} ms")
+    asyncio.run(run(concurrencies))
+
+
+if __name__ == "__main__":
+    main()
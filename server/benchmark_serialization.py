@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: list-endpoint serialization, validated models vs. the trusted fast path.
+
+"models" is what read_users/get_saved_matches did before: build a User per
+document, let response_model validate it again, then jsonable_encoder and the
+stdlib encoder. "trusted" is core.serialization: project the document onto the
+model's fields and render with orjson.
+
+Usage: python benchmark_serialization.py [documents ...]
+"""
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from core.serialization import trusted_response
+from skillshare_data_models import User
+
+STARTED = datetime(2026, 1, 1, 9, 30)
+
+
+def user_doc(i):
+    return {
+        "id": f"user-{i}",
+        "email": f"user{i}@example.com",
+        "name": f"User {i}",
+        "headline": "Full-stack developer",
+        "country": "IN",
+        "experienceLevel": "Intermediate",
+        "xp": i * 7 % 5000,
+        "level": i * 7 % 5000 // 100 + 1,
+        "streak": i % 30,
+        "skills": ["React", "FastAPI", "PostgreSQL"],
+        "learning": ["Rust", "Go"],
+        "badges": [{"name": "Mentor", "level": "gold"}],
+        "lastCheckIn": STARTED + timedelta(hours=i),
+        "createdAt": STARTED,
+        "updatedAt": STARTED + timedelta(days=1),
+        # Stored alongside the profile but not part of the response model
+        "dailyCounts": {"2026-01-01": {"sessions": 1}},
+        "matchScore": 50,
+    }
+
+
+def models(docs):
+    users = [User(**doc) for doc in docs]
+    # response_model validates the returned objects once more before encoding
+    validated = [User(**user.dict()) for user in users]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def trusted(docs):
+    return trusted_response(User, docs).body
+
+
+def main():
+    counts = [int(n) for n in sys.argv[1:]] or [100, 1000, 10000]
+    for count in counts:
+        docs = [user_doc(i) for i in range(count)]
+        assert json.loads(models(docs)) == json.loads(trusted(docs))
+        number = max(1, 20000 // count)
+        for label, fn in (("models", models), ("trusted", trusted)):
+            seconds = min(timeit.repeat(lambda: fn(docs), number=number, repeat=3)) / number
+            print(f"{count:>7} docs {label:>8}: {count / seconds:>12,.0f} docs/s  ({seconds * 1000:.2f} ms per response)")
+
+
+if __name__ == "__main__":
+    main()
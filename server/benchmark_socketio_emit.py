@@ -0,0 +1,93 @@
+"""
+Load harness: emit latency to N sockets spread across two Socket.IO workers.
+
+Two AsyncServer instances share an InMemoryPubSubManager channel, the way two
+gunicorn workers share Redis through AsyncRedisManager. Sockets are registered
+directly with each server's manager (half on each) and join one chat room;
+outgoing Engine.IO packets are captured instead of written to a transport.
+Each round emits one message from the first worker through the Notifier and
+measures the time until every socket on both workers has been handed its packet.
+
+Usage: python benchmark_socketio_emit.py [rounds] [sockets ...]
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import socketio
+
+from core.notifier import Notifier
+from core.realtime import InMemoryPubSubManager
+
+ROOM = "alice_bob"
+
+
+class Worker:
+    """One AsyncServer whose outgoing packets are counted rather than sent."""
+
+    def __init__(self, channel: str, sink):
+        self.sio = socketio.AsyncServer(async_mode="asgi", client_manager=InMemoryPubSubManager(channel=channel))
+        self.sio.eio.send = sink
+        self.sio.eio.send_packet = sink
+        self.sio.manager.initialize()
+        self.sio.manager_initialized = True
+
+    async def add_sockets(self, count: int):
+        for _ in range(count):
+            sid = await self.sio.manager.connect(uuid.uuid4().hex, "/")
+            await self.sio.manager.enter_room(sid, "/", ROOM)
+
+    async def stop(self):
+        self.sio.manager.thread.cancel()
+
+
+async def measure(sockets: int, rounds: int):
+    received = 0
+    done = asyncio.Event()
+    expected = sockets
+
+    async def sink(eio_sid, packet):
+        nonlocal received
+        received += 1
+        if received == expected:
+            done.set()
+
+    channel = f"bench-{uuid.uuid4().hex}"
+    workers = [Worker(channel, sink), Worker(channel, sink)]
+    await workers[0].add_sockets(sockets // 2)
+    await workers[1].add_sockets(sockets - sockets // 2)
+    await asyncio.sleep(0)  # let both listeners start
+    notifier = Notifier(workers[0].sio)
+
+    latencies = []
+    for i in range(rounds):
+        received = 0
+        done.clear()
+        started = time.perf_counter()
+        await notifier.emit("receive_message", {"content": f"message {i}", "room": ROOM}, [ROOM])
+        await asyncio.wait_for(done.wait(), 10)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0)  # drain stragglers before the next round
+
+    for worker in workers:
+        await worker.stop()
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+async def run(rounds, socket_counts):
+    for sockets in socket_counts:
+        median, p95 = await measure(sockets, rounds)
+        print(f"{sockets:>6} sockets over 2 workers: median {median * 1000:>8.2f} ms  p95 {p95 * 1000:>8.2f} ms")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    socket_counts = [int(n) for n in sys.argv[2:]] or [10, 100, 1000, 5000]
+    asyncio.run(run(rounds, socket_counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of plain data (dicts, lists, scalars) for budget accounting."""
+    size = sys.getsizeof(value)
+    if _depth > 8:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    elif hasattr(value, "__slots__"):
+        for slot in value.__slots__:
+            size += estimate_size(getattr(value, slot, None), _depth + 1)
+    return size
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL on the monotonic clock.
+
+    Evicts least recently used entries once either `max_entries` or `max_bytes`
+    is exceeded, and drops expired entries lazily on access. Thread-safe so it
+    can be shared with executor threads.
+    """
+
+    def __init__(self, name: str, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 300.0, sizeof=estimate_size):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at <= now:
+                self._drop(key)
+                self.expirations += 1
+                if count:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        size = self._sizeof(value) if ttl > 0 else 0
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            # Not cacheable: the previous value is gone all the same, so it is never served stale
+            if ttl <= 0 or size > self.max_bytes:
+                return
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,89 @@
+import logging
+from typing import Iterable
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from core import repositories
+from core.repositories import Repository, messages_repo
+from core.user_stats import known_users, stage_counters
+
+logger = logging.getLogger(__name__)
+
+# One summary document per chat room:
+# {room, participants, lastMessage: {content, timestamp, senderId}, lastMessageAt, unread: {uid: n}}
+conversations_repo = Repository("conversations")
+
+
+def room_for(user_a: str, user_b: str) -> str:
+    return "_".join(sorted([user_a, user_b]))
+
+
+def stage_message(batch, message_data: dict, participants: Iterable[str], count_sender: bool = True,
+                  msg_ref=None):
+    """
+    Stage a message write and its conversation summary update on `batch`.
+
+    Both land in the same commit, so the summary can never disagree with the
+    messages collection. Unless `count_sender` is False (the caller stages the
+    counter itself), the sender's messageCount is incremented in the same
+    commit. Returns the new message's reference.
+
+    With a caller-chosen `msg_ref` the message is staged with create(), so
+    committing the same message twice fails with AlreadyExists instead of
+    applying the batch's increments again.
+    """
+    participants = sorted({p for p in participants if p and p != "system"})
+    room = message_data.get("room") or room_for(*participants)
+    receiver_id = message_data.get("receiverId")
+
+    if msg_ref is None:
+        msg_ref = messages_repo.document()
+        batch.set(msg_ref, message_data)
+    else:
+        batch.create(msg_ref, message_data)
+
+    summary = {
+        "room": room,
+        "participants": participants,
+        "lastMessage": {
+            "content": message_data.get("content", ""),
+            "timestamp": message_data.get("timestamp"),
+            "senderId": message_data.get("senderId"),
+        },
+        "lastMessageAt": message_data.get("timestamp"),
+    }
+    if receiver_id and receiver_id != message_data.get("senderId"):
+        summary["unread"] = {receiver_id: firestore.Increment(1)}
+    batch.set(conversations_repo.document(room), summary, merge=True)
+
+    sender_id = message_data.get("senderId")
+    if count_sender and sender_id and sender_id != "system":
+        stage_counters(batch, sender_id, {"messageCount": 1})
+    return msg_ref
+
+
+async def record_message(message_data: dict, participants: Iterable[str]):
+    """Write a single message and its conversation summary in one commit."""
+    batch = repositories.batch()
+    count_sender = message_data.get("senderId") in await known_users([message_data.get("senderId")])
+    msg_ref = stage_message(batch, message_data, participants, count_sender=count_sender)
+    await repositories.commit(batch)
+    return msg_ref
+
+
+async def fetch_conversations(user_id: str) -> list:
+    """All conversations a user takes part in, most recent first (single indexed query)."""
+    query = (
+        conversations_repo.where("participants", "array_contains", user_id)
+        .order_by("lastMessageAt", direction="DESCENDING")
+    )
+    return await conversations_repo.fetch(query)
+
+
+async def mark_read(room: str, user_id: str):
+    """Reset a user's unread counter for a room."""
+    try:
+        await conversations_repo.update(room, {f"unread.{user_id}": 0})
+    except NotFound:
+        pass
@@ -1,13 +1,15 @@
+from typing import Optional
+from urllib.parse import parse_qs
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from firebase_admin import auth
+from core.token_verifier import token_verifier
 
 security = HTTPBearer()
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await token_verifier.verify(token)
         uid = decoded_token['uid']
         return uid
     except Exception as e:
@@ -16,3 +18,29 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+async def authenticate_socket(environ: dict, auth: Optional[dict] = None) -> Optional[str]:
+    """
+    Resolve the uid for a Socket.IO connection using the same verified-token cache.
+
+    The token may come from the `auth` payload, a `token` query parameter or an
+    Authorization header. Returns None when no token was sent and raises
+    ValueError when the token is invalid; the caller decides whether that
+    refuses the connection.
+    """
+    token = None
+    if isinstance(auth, dict):
+        token = auth.get("token")
+    if not token:
+        token = parse_qs(environ.get("QUERY_STRING", "")).get("token", [None])[0]
+    if not token:
+        header = environ.get("HTTP_AUTHORIZATION", "")
+        if header.lower().startswith("bearer "):
+            token = header[7:]
+    if not token:
+        return None
+    try:
+        decoded_token = await token_verifier.verify(token)
+    except Exception as e:
+        raise ValueError("Invalid authentication credentials") from e
+    return decoded_token['uid']
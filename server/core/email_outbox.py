@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from core.firebase_config import db
+from core.repositories import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class SendGridTransport:
+    """Delivers outbox jobs through the SendGrid API."""
+
+    def __init__(self, api_key: Optional[str] = None, from_email: Optional[str] = None):
+        from sendgrid import SendGridAPIClient
+
+        self.from_email = from_email or os.getenv("FROM_EMAIL", "skillsharetest0107@gmail.com")
+        self.sg = SendGridAPIClient(api_key or os.getenv("SENDGRID_API_KEY"))
+
+    def send(self, job: dict):
+        from email_service import build_mail
+
+        message = build_mail(
+            self.from_email, job["subject"], job["html"],
+            to_email=job["to"], personalizations=job.get("personalizations"),
+        )
+        response = self.sg.send(message)
+        if response.status_code >= 400:
+            raise RuntimeError(f"SendGrid returned {response.status_code}")
+        return response.status_code
+
+
+class FakeTransport:
+    """Local stand-in for SendGrid: records jobs instead of sending, optionally failing first."""
+
+    def __init__(self, fail_times: int = 0):
+        self.sent: List[dict] = []
+        self.fail_times = fail_times
+
+    def send(self, job: dict):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("Simulated delivery failure")
+        self.sent.append(job)
+        logger.info(f"--- FAKE EMAIL TO {job.get('to')} --- Subject: {job.get('subject')}")
+        return 202
+
+
+class EmailOutbox:
+    """
+    Durable email outbox delivered by a pool of background workers.
+
+    Handlers enqueue jobs and return immediately. Each job is persisted to the
+    `store` collection (when given) so a restart can pick it up again, and
+    workers deliver it through `transport` on the executor, retrying with
+    exponential backoff. Jobs that exhaust `max_attempts` go to the dead-letter
+    list and are kept in the store with status "dead".
+    """
+
+    def __init__(self, transport, store=None, workers: int = 4, max_attempts: int = 5,
+                 base_delay: float = 2.0, max_delay: float = 300.0, max_dead_letters: int = 1000,
+                 recover_after: float = 600.0):
+        self.transport = transport
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_dead_letters = max_dead_letters
+        self.recover_after = recover_after
+        self.dead_letters: List[dict] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._background = set()
+        self._persisting = {}
+        self._retrying = 0
+        self._in_flight = 0
+        self.sent = 0
+        self.failed_attempts = 0
+        self._latency_total = 0.0
+
+    # --- Producer side ---
+
+    def enqueue(self, to_email: str, subject: str, html_content: str, **extra) -> str:
+        """Queue an email for background delivery and return the job ID."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "to": to_email,
+            "subject": subject,
+            "html": html_content,
+            "attempts": 0,
+            "enqueuedAt": time.time(),
+            **extra,
+        }
+        if self.store is not None:
+            # Start persisting before queueing: if this raises (e.g. no running loop)
+            # nothing was queued, so the caller's direct-send fallback can't double-send
+            persist = self._persist(job)
+            try:
+                self._persisting[job["id"]] = self._spawn(persist)
+            except Exception:
+                persist.close()
+                raise
+        self._queue.put_nowait(job)
+        return job["id"]
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _persist(self, job: dict):
+        try:
+            await self.store.set(job["id"], {**job, "status": "pending", "updatedAt": datetime.now()})
+        except Exception as e:
+            logger.error(f"Failed to persist email job {job['id']}: {e}")
+
+    async def _mark(self, job: dict, status: str, error: Optional[str] = None):
+        if self.store is None:
+            return
+        # The initial write must land first, or it could resurrect a delivered job
+        persisting = self._persisting.pop(job["id"], None)
+        if persisting is not None:
+            await asyncio.shield(persisting)
+        try:
+            if status == "sent":
+                await self.store.delete(job["id"])
+            else:
+                await self.store.set(job["id"], {
+                    **job, "status": status, "lastError": error, "updatedAt": datetime.now()
+                })
+        except Exception as e:
+            logger.error(f"Failed to update email job {job['id']}: {e}")
+
+    # --- Workers ---
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._deliver(job)
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    async def _deliver(self, job: dict):
+        job["attempts"] += 1
+        try:
+            await run_blocking(self.transport.send, job)
+        except Exception as e:
+            self.failed_attempts += 1
+            if job["attempts"] >= self.max_attempts:
+                logger.error(f"Email {job['id']} to {job.get('to')} dead-lettered after {job['attempts']} attempts: {e}")
+                self.dead_letters.append({**job, "lastError": str(e)})
+                del self.dead_letters[:-self.max_dead_letters]
+                await self._mark(job, "dead", str(e))
+                return
+            delay = min(self.base_delay * 2 ** (job["attempts"] - 1), self.max_delay)
+            logger.warning(f"Email {job['id']} attempt {job['attempts']} failed, retrying in {delay:.0f}s: {e}")
+            await self._mark(job, "pending", str(e))
+            self._retrying += 1
+            self._spawn(self._requeue_later(job, delay))
+            return
+
+        self.sent += 1
+        self._latency_total += time.time() - job["enqueuedAt"]
+        logger.info(f"Email sent successfully to {job.get('to')}")
+        await self._mark(job, "sent")
+
+    async def _requeue_later(self, job: dict, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._retrying -= 1
+        self._queue.put_nowait(job)
+
+    async def _claim(self, snapshot) -> bool:
+        """Take ownership of a recovered job; only one worker wins when several restart together."""
+        try:
+            option = db.write_option(last_update_time=snapshot.update_time)
+            await run_blocking(snapshot.reference.update, {"updatedAt": datetime.now()}, option=option)
+            return True
+        except Exception:
+            return False
+
+    async def _recover(self):
+        """Re-queue jobs left pending by a previous run and not touched for `recover_after` seconds."""
+        if self.store is None:
+            return
+        try:
+            docs = await self.store.fetch(self.store.where("status", "==", "pending"))
+        except Exception as e:
+            logger.error(f"Failed to recover pending emails: {e}")
+            return
+        cutoff = time.time() - self.recover_after
+        recovered = 0
+        for doc in docs:
+            job = doc.to_dict()
+            updated_at = job.pop("updatedAt", None)
+            if updated_at is not None and updated_at.timestamp() > cutoff:
+                continue
+            if not await self._claim(doc):
+                continue
+            job.pop("status", None)
+            job.pop("lastError", None)
+            self._queue.put_nowait(job)
+            recovered += 1
+        if recovered:
+            logger.info(f"Recovered {recovered} pending emails from the outbox")
+
+    async def start(self):
+        if self._tasks:
+            return
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued deliveries a chance to finish; anything left stays pending in the store."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Email outbox stopped with {self._queue.qsize()} jobs still queued")
+        for task in self._tasks + list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._background, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "queueDepth": self._queue.qsize(),
+            "inFlight": self._in_flight,
+            "retrying": self._retrying,
+            "sent": self.sent,
+            "failedAttempts": self.failed_attempts,
+            "deadLetters": len(self.dead_letters),
+            "avgDeliveryLatencyMs": round(self._latency_total / self.sent * 1000, 1) if self.sent else 0.0,
+        }
+
+
+def create_transport_from_env():
+    """EMAIL_TRANSPORT = sendgrid (default) | fake"""
+    if os.getenv("EMAIL_TRANSPORT", "sendgrid").lower() == "fake":
+        return FakeTransport()
+    return SendGridTransport()
@@ -0,0 +1,228 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "skillshare:invalidate"
+
+
+class LocalBackend:
+    """Single-process backend: invalidations are only applied to this worker's caches."""
+
+    async def start(self, deliver: Callable[[dict], None]):
+        pass
+
+    async def publish(self, message: dict):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class UnixSocketBackend:
+    """
+    Same-host multi-process backend for gunicorn/uvicorn workers without Redis.
+
+    Every worker binds a datagram socket in a shared directory and publishing
+    sends the message to every socket found there; sockets of dead workers are
+    cleaned up on the first failed send.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock: Optional[socket.socket] = None
+        self._loop = None
+
+    async def start(self, deliver: Callable[[dict], None]):
+        os.makedirs(self.directory, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        self._loop = asyncio.get_running_loop()
+
+        def on_readable():
+            while True:
+                try:
+                    data = self._sock.recv(65536)
+                except (BlockingIOError, InterruptedError):
+                    return
+                try:
+                    deliver(json.loads(data))
+                except ValueError:
+                    logger.warning("Dropping malformed invalidation datagram")
+
+        self._loop.add_reader(self._sock.fileno(), on_readable)
+
+    async def publish(self, message: dict):
+        if self._sock is None:
+            return
+        data = json.dumps(message).encode()
+        for peer in glob.glob(os.path.join(self.directory, "*.sock")):
+            if peer == self.path:
+                continue
+            try:
+                self._sock.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone; remove its stale socket file
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning(f"Invalidation queue full for {peer}; message dropped")
+
+    async def stop(self):
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class RedisBackend:
+    """
+    Redis pub/sub backend for workers spread across hosts.
+
+    `client` may be any object exposing the redis.asyncio `publish()` / `pubsub()`
+    API, so a local stand-in can replace a real server.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, channel: str = INVALIDATION_CHANNEL):
+        self.url = url
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[dict], None]):
+        if self.client is None:
+            import redis.asyncio as redis
+            self.client = redis.from_url(self.url)
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(deliver))
+
+    async def _listen(self, deliver: Callable[[dict], None]):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        deliver(json.loads(message["data"]))
+                    except ValueError:
+                        logger.warning("Dropping malformed invalidation message")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Invalidation listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+                try:
+                    await self._pubsub.subscribe(self.channel)
+                except Exception:
+                    pass
+
+    async def publish(self, message: dict):
+        await self.client.publish(self.channel, json.dumps(message))
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+
+
+class InvalidationBus:
+    """
+    Broadcasts cache invalidations to every worker.
+
+    `publish(kind, key)` runs the local handlers immediately and forwards the
+    message through the backend; messages coming back from other workers run the
+    same handlers, while this worker's own echoes are ignored.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LocalBackend()
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._pending = set()
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, kind: str, handler: Callable[[str], None]):
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def publish(self, kind: str, key: str):
+        self._apply(kind, key)
+        self.published += 1
+        message = {"origin": self.origin, "kind": kind, "key": key}
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Not on the event loop (e.g. executor thread at startup)
+        task = loop.create_task(self._forward(message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _forward(self, message: dict):
+        try:
+            await self.backend.publish(message)
+        except Exception as e:
+            logger.error(f"Failed to broadcast invalidation {message['kind']}:{message['key']}: {e}")
+
+    def _deliver(self, message: dict):
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        self._apply(message.get("kind"), message.get("key"))
+
+    def _apply(self, kind: str, key: str):
+        for handler in self._handlers.get(kind, ()):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {kind} failed: {e}", exc_info=True)
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.backend.stop()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+def create_backend_from_env():
+    """INVALIDATION_BACKEND = local | unix | redis (defaults to redis when REDIS_URL is set)"""
+    redis_url = os.getenv("REDIS_URL")
+    backend = os.getenv("INVALIDATION_BACKEND", "redis" if redis_url else "local").lower()
+    if backend == "redis":
+        return RedisBackend(url=redis_url or "redis://localhost:6379/0")
+    if backend == "unix":
+        return UnixSocketBackend(os.getenv("INVALIDATION_SOCKET_DIR", "/tmp/skillshare-invalidation"))
+    return LocalBackend()
+
+
+invalidation_bus = InvalidationBus(create_backend_from_env())
@@ -0,0 +1,107 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+METRICS = ("xp", "streak")
+
+# Profile fields the leaderboard needs to render a row
+LEADERBOARD_FIELDS = ["name", "avatar", "location", "country", "xp", "sessions", "streak"]
+
+
+class LeaderboardEngine:
+    """
+    Materialized leaderboard kept in memory and updated from the write paths.
+
+    Each metric keeps a SortedList of (-value, user_id) keys, so ranks and the top
+    N are O(log n) reads and ties are broken by user ID like the original scan.
+    """
+
+    def __init__(self, metrics: Iterable[str] = METRICS):
+        self._lock = threading.Lock()
+        self._metrics = tuple(metrics)
+        self._rankings: Dict[str, SortedList] = {m: SortedList() for m in self._metrics}
+        self._rows: Dict[str, dict] = {}
+        self.ready = False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def build(self, users: Iterable[Tuple[str, dict]]):
+        """Rebuild all rankings from (user_id, user_data) pairs."""
+        rows = {user_id: self._row(user_data) for user_id, user_data in users}
+        rankings = {
+            m: SortedList((-row[m], user_id) for user_id, row in rows.items())
+            for m in self._metrics
+        }
+        with self._lock:
+            self._rows, self._rankings = rows, rankings
+            self.ready = True
+
+    def upsert(self, user_id: str, changes: dict):
+        """Apply the leaderboard-relevant fields of `changes` to a user's row."""
+        changes = {k: v for k, v in changes.items() if k in LEADERBOARD_FIELDS}
+        if not changes and user_id in self._rows:
+            return
+        with self._lock:
+            self._apply(user_id, changes)
+
+    def increment(self, user_id: str, deltas: dict) -> Optional[dict]:
+        """Add `deltas` to a known user's numeric fields; returns the row before the change."""
+        deltas = {k: v for k, v in deltas.items() if k in LEADERBOARD_FIELDS}
+        with self._lock:
+            old = self._rows.get(user_id)
+            if old is not None:
+                self._apply(user_id, {k: (old.get(k) or 0) + v for k, v in deltas.items()})
+            return old
+
+    def _apply(self, user_id: str, changes: dict):
+        old = self._rows.get(user_id)
+        row = self._row({**(old or {}), **changes})
+        for m in self._metrics:
+            if old is not None and old[m] == row[m]:
+                continue
+            if old is not None:
+                self._rankings[m].discard((-old[m], user_id))
+            self._rankings[m].add((-row[m], user_id))
+        self._rows[user_id] = row
+
+    def remove(self, user_id: str):
+        with self._lock:
+            old = self._rows.pop(user_id, None)
+            if old is not None:
+                for m in self._metrics:
+                    self._rankings[m].discard((-old[m], user_id))
+
+    def top(self, metric: str, n: int, offset: int = 0) -> List[dict]:
+        """Rows ranked offset+1 .. offset+n."""
+        with self._lock:
+            keys = list(self._rankings[metric].islice(offset, offset + n))
+            return [self._entry(user_id, offset + index + 1) for index, (_, user_id) in enumerate(keys)]
+
+    def rank_of(self, metric: str, user_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return None
+            rank = self._rankings[metric].index((-row[metric], user_id)) + 1
+            return self._entry(user_id, rank)
+
+    def _entry(self, user_id: str, rank: int) -> dict:
+        row = self._rows[user_id]
+        return {"rank": rank, "id": user_id, **row}
+
+    @staticmethod
+    def _row(user_data: dict) -> dict:
+        return {
+            "name": user_data.get("name"),
+            "avatar": user_data.get("avatar"),
+            "location": user_data.get("location"),
+            "country": user_data.get("country"),
+            "xp": user_data.get("xp") or 0,
+            "sessions": user_data.get("sessions") or 0,
+            "streak": user_data.get("streak") or 0,
+        }
+
+
+leaderboard = LeaderboardEngine()
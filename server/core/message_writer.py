@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from core import repositories
+from core.conversations import stage_message
+from core.repositories import messages_repo
+from core.user_stats import known_users, stage_counters
+
+logger = logging.getLogger(__name__)
+
+# Each message is two writes (message + conversation summary) plus at most one
+# sender counter update per batch; Firestore allows 500 writes per batch
+MAX_MESSAGES_PER_BATCH = 160
+
+# Commit errors worth retrying as-is; anything else is blamed on the batch contents
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+class MessageQueueFull(Exception):
+    """Raised by submit() when the write-behind queue is at its backpressure limit."""
+
+
+class _PendingMessage:
+    __slots__ = ("message_data", "participants", "ack", "ref")
+
+    def __init__(self, message_data: dict, participants: List[str], ack):
+        self.message_data = message_data
+        self.participants = participants
+        self.ack = ack
+        # ID fixed once, so every commit attempt writes the same document
+        self.ref = messages_repo.document()
+
+
+class MessageWriter:
+    """
+    Write-behind persistence for chat messages.
+
+    Messages are queued and a single writer task groups them into Firestore
+    WriteBatch commits, closing a batch when it is full or `max_delay` has
+    passed since its first message. Batches are committed strictly in order and
+    a failing batch is retried with backoff before anything behind it, so each
+    room's messages are stored in the order they were sent. A batch rejected
+    for a non-transient reason is split in halves until the offending message
+    is isolated; only that one is dead-lettered. `on_commit` is awaited for
+    every message once its batch is durable (or has finally failed).
+
+    Each message gets its document ID when queued and is created under it, so
+    retrying a commit whose first attempt landed (a timeout after the write)
+    fails with AlreadyExists rather than storing it twice or re-applying the
+    batch's counter increments.
+    """
+
+    def __init__(
+        self,
+        on_commit: Optional[Callable[[object, Optional[str], Optional[Exception]], Awaitable[None]]] = None,
+        max_batch: int = MAX_MESSAGES_PER_BATCH,
+        max_delay: float = 0.05,
+        max_pending: int = 10000,
+        max_retries: int = 5,
+        max_dead_letters: int = 1000,
+    ):
+        self.on_commit = on_commit
+        self.max_batch = min(max_batch, MAX_MESSAGES_PER_BATCH)
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.max_dead_letters = max_dead_letters
+        self.dead_letters: List[dict] = []
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+
+    def submit(self, message_data: dict, participants: Iterable[str], ack=None):
+        """Queue a message for persistence without waiting for Firestore."""
+        try:
+            self._queue.put_nowait(_PendingMessage(message_data, list(participants), ack))
+        except asyncio.QueueFull:
+            raise MessageQueueFull("Message queue is full")
+
+    async def _next_batch(self) -> List[_PendingMessage]:
+        items = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(items) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    def _dead_letter(self, item: _PendingMessage, error: Exception):
+        logger.error(f"Dead-lettering message from {item.message_data.get('senderId')!r}: {error}")
+        self.failed += 1
+        self.dead_letters.append({**item.message_data, "lastError": str(error)})
+        del self.dead_letters[:-self.max_dead_letters]
+
+    def _stage(self, items: List[_PendingMessage], senders: set) -> Tuple[object, list, List[Optional[Exception]]]:
+        """
+        Stage `items` on a new batch; a message that cannot even be staged is dead-lettered.
+        messageCount is only incremented for `senders`, the senders known to exist.
+        """
+        batch = repositories.batch()
+        refs: list = [None] * len(items)
+        errors: List[Optional[Exception]] = [None] * len(items)
+        sent_by = Counter()
+        for i, item in enumerate(items):
+            try:
+                refs[i] = stage_message(batch, item.message_data, item.participants, count_sender=False,
+                                        msg_ref=item.ref)
+            except Exception as e:
+                self._dead_letter(item, e)
+                errors[i] = e
+                continue
+            sender_id = item.message_data.get("senderId")
+            if isinstance(sender_id, str) and sender_id in senders:
+                sent_by[sender_id] += 1
+        for sender_id, count in sent_by.items():
+            stage_counters(batch, sender_id, {"messageCount": count})
+        return batch, refs, errors
+
+    async def _commit(self, items: List[_PendingMessage]) -> Tuple[list, List[Optional[Exception]]]:
+        delay = 0.1
+        senders = await known_users(item.message_data.get("senderId") for item in items)
+        for attempt in range(self.max_retries + 1):
+            batch, refs, errors = self._stage(items, senders)
+            staged = sum(ref is not None for ref in refs)
+            if not staged:
+                return refs, errors
+            try:
+                await repositories.commit(batch)
+                self.batches += 1
+                self.committed += staged
+                return refs, errors
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Dropping batch of {staged} messages after {attempt + 1} attempts: {e}")
+                    self.failed += staged
+                    return [None] * len(items), [error or e for error in errors]
+                self.retries += 1
+                logger.warning(f"Message batch commit failed (attempt {attempt + 1}), retrying: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+            except Exception as e:
+                if attempt > 0 and isinstance(e, google_exceptions.AlreadyExists):
+                    # An earlier attempt landed though its error reached us; the batch is atomic
+                    logger.info(f"Message batch of {staged} was already committed by an earlier attempt")
+                    self.batches += 1
+                    self.committed += staged
+                    return refs, errors
+                live = [item for item, ref in zip(items, refs) if ref is not None]
+                if len(live) == 1:
+                    self._dead_letter(live[0], e)
+                    return [None] * len(items), [error or e for error in errors]
+                # Rejected batch: split it so only the offending message is lost, keeping order
+                logger.warning(f"Message batch of {len(live)} rejected, splitting: {e}")
+                middle = len(live) // 2
+                first_refs, first_errors = await self._commit(live[:middle])
+                second_refs, second_errors = await self._commit(live[middle:])
+                results = iter(zip(first_refs + second_refs, first_errors + second_errors))
+                for i, ref in enumerate(refs):
+                    if ref is not None:
+                        refs[i], errors[i] = next(results)
+                return refs, errors
+
+    async def _acknowledge(self, items: List[_PendingMessage], refs: list, errors: List[Optional[Exception]]):
+        if self.on_commit is None:
+            return
+        for item, ref, error in zip(items, refs, errors):
+            try:
+                await self.on_commit(item.ack, ref.id if ref is not None else None, error)
+            except Exception as e:
+                logger.error(f"Message ack callback failed: {e}")
+
+    async def _run(self):
+        while True:
+            items = await self._next_batch()
+            try:
+                refs, errors = await self._commit(items)
+                await self._acknowledge(items, refs, errors)
+            except Exception as e:
+                # Never let one batch take the only writer task down with it
+                logger.error(f"Message writer failed on a batch of {len(items)}: {e}", exc_info=True)
+                self.failed += len(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued, then stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "maxPending": self._queue.maxsize,
+            "committed": self.committed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "deadLetters": len(self.dead_letters),
+        }
@@ -0,0 +1,57 @@
+import logging
+import time
+from collections import Counter, deque
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Notifier:
+    """
+    Emits one payload to a set of rooms in a single Socket.IO emit.
+
+    python-socketio encodes the packet once for all recipients and resolves a
+    list of rooms to unique sockets, so a client that sits in both the chat
+    room and its personal room gets the event once. The notifier also records
+    per-emit fan-out (sockets reached on this worker) and emit latency.
+    """
+
+    def __init__(self, sio, namespace: str = "/", window: int = 1000):
+        self.sio = sio
+        self.namespace = namespace
+        self._latencies = deque(maxlen=window)
+        self._events = Counter()
+        self.emits = 0
+        self.recipients = 0
+        self.max_fanout = 0
+
+    def _fanout(self, rooms: list, skip_sid: Optional[str]) -> int:
+        participants = {sid for sid, _ in self.sio.manager.get_participants(self.namespace, rooms)}
+        participants.discard(skip_sid)
+        return len(participants)
+
+    async def emit(self, event: str, payload, rooms: Iterable[str], skip_sid: Optional[str] = None) -> int:
+        """Deliver `payload` once to every socket in any of `rooms`; returns the local fan-out."""
+        rooms = list(dict.fromkeys(room for room in rooms if room))
+        if not rooms:
+            return 0
+        started = time.perf_counter()
+        fanout = self._fanout(rooms, skip_sid)
+        await self.sio.emit(event, payload, to=rooms, skip_sid=skip_sid, namespace=self.namespace)
+        self._latencies.append(time.perf_counter() - started)
+        self._events[event] += 1
+        self.emits += 1
+        self.recipients += fanout
+        self.max_fanout = max(self.max_fanout, fanout)
+        return fanout
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "emits": self.emits,
+            "byEvent": dict(self._events),
+            "avgFanout": round(self.recipients / self.emits, 2) if self.emits else 0.0,
+            "maxFanout": self.max_fanout,
+            "avgLatencyMs": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "p95LatencyMs": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3) if latencies else 0.0,
+        }
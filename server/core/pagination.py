@@ -0,0 +1,34 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort-key values of a row as an opaque, URL-safe cursor."""
+    payload = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(payload, list):
+        raise ValueError("Invalid cursor")
+    return [
+        datetime.fromisoformat(v["$dt"]) if isinstance(v, dict) and "$dt" in v else v
+        for v in payload
+    ]
+
+
+def clamp_page_size(limit: int, default: int = 50) -> int:
+    if limit is None or limit <= 0:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
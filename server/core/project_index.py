@@ -0,0 +1,161 @@
+import bisect
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sortedcontainers import SortedList
+
+from core.skill_index import normalize_terms
+
+# Facets a project can be filtered on; stack is multi-valued
+FACETS = ("stack", "difficulty", "type")
+
+
+def _facet_values(facet: str, project: dict) -> Set[str]:
+    if facet == "stack":
+        return normalize_terms(project.get("stack", []))
+    return normalize_terms([project.get(facet)])
+
+
+def _sort_key(project_id: str, project: dict) -> Tuple[float, str]:
+    created_at = project.get("createdAt")
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            created_at = None
+    if isinstance(created_at, datetime) and created_at.tzinfo is None:
+        # Firestore stores naive datetimes as UTC; key them the same way before and after a reload
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    timestamp = created_at.timestamp() if isinstance(created_at, datetime) else 0.0
+    # Newest first, ties broken by ID
+    return (-timestamp, project_id)
+
+
+class ProjectIndex:
+    """
+    In-process faceted index over the projects collection.
+
+    Each facet value keeps a posting set of project IDs and all projects sit in
+    one SortedList in newest-first order. A filtered page intersects the posting
+    sets (smallest first) and walks the ordered list from the cursor, so the
+    work per request depends on the page size and the size of the matching set
+    rather than the number of projects. Kept current by the project write paths.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._projects: Dict[str, dict] = {}
+        self._keys: Dict[str, Tuple[float, str]] = {}
+        self._order = SortedList()
+        self._postings: Dict[str, Dict[str, Set[str]]] = {facet: {} for facet in FACETS}
+        self._open: Set[str] = set()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._projects)
+
+    def build(self, projects: Iterable[Tuple[str, dict]]):
+        """Rebuild the index from (project_id, project_data) pairs."""
+        fresh = ProjectIndex()
+        for project_id, project in projects:
+            fresh._link(project_id, project)
+        with self._lock:
+            self._projects, self._keys, self._order = fresh._projects, fresh._keys, fresh._order
+            self._postings, self._open = fresh._postings, fresh._open
+            self.ready = True
+
+    def upsert(self, project_id: str, project: dict):
+        with self._lock:
+            self._unlink(project_id)
+            self._link(project_id, project)
+
+    def remove(self, project_id: str):
+        with self._lock:
+            self._unlink(project_id)
+
+    def get(self, project_id: str) -> Optional[dict]:
+        return self._projects.get(project_id)
+
+    def _link(self, project_id: str, project: dict):
+        project = {**project, "id": project_id}
+        key = _sort_key(project_id, project)
+        self._projects[project_id] = project
+        self._keys[project_id] = key
+        self._order.add(key)
+        for facet in FACETS:
+            for value in _facet_values(facet, project):
+                self._postings[facet].setdefault(value, set()).add(project_id)
+        if (project.get("spots") or 0) > 0:
+            self._open.add(project_id)
+
+    def _unlink(self, project_id: str):
+        project = self._projects.pop(project_id, None)
+        if project is None:
+            return
+        self._order.discard(self._keys.pop(project_id))
+        for facet in FACETS:
+            postings = self._postings[facet]
+            for value in _facet_values(facet, project):
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(project_id)
+                    if not ids:
+                        del postings[value]
+        self._open.discard(project_id)
+
+    def _candidates(self, filters: Dict[str, Iterable[str]], open_only: bool) -> Optional[Set[str]]:
+        """IDs matching every filter (any value within a facet), or None when unfiltered."""
+        sets = []
+        for facet, values in filters.items():
+            values = normalize_terms(values)
+            if not values:
+                continue
+            postings = self._postings[facet]
+            sets.append(set().union(*(postings.get(v, ()) for v in values)))
+        if open_only:
+            sets.append(self._open)
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def query(
+        self,
+        stack: Optional[Iterable[str]] = None,
+        difficulty: Optional[Iterable[str]] = None,
+        type: Optional[Iterable[str]] = None,
+        open_only: bool = False,
+        after: Optional[Tuple[float, str]] = None,
+        limit: int = 50,
+    ) -> Tuple[List[dict], Optional[Tuple[float, str]]]:
+        """
+        One page of matching projects, newest first, strictly after the `after` key.
+
+        Returns the page and the key to pass as `after` for the next one (None
+        when this is the last page).
+        """
+        with self._lock:
+            candidates = self._candidates(
+                {"stack": stack or [], "difficulty": difficulty or [], "type": type or []}, open_only
+            )
+            start = self._order.bisect_right(tuple(after)) if after else 0
+            if candidates is not None and len(candidates) * 8 < len(self._order):
+                # Small match set: order just the matches
+                keys = sorted(self._keys[pid] for pid in candidates)
+                keys = keys[bisect.bisect_right(keys, tuple(after)):] if after else keys
+                page = keys[:limit + 1]
+            else:
+                page = []
+                for key in self._order.islice(start):
+                    if candidates is None or key[1] in candidates:
+                        page.append(key)
+                        if len(page) > limit:
+                            break
+            has_more = len(page) > limit
+            page = page[:limit]
+            items = [self._projects[pid] for _, pid in page]
+        return items, (page[-1] if has_more and page else None)
+
+
+project_index = ProjectIndex()
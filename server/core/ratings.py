@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Optional
+
+from firebase_admin import firestore
+
+from core.firebase_config import db
+from core.repositories import run_blocking, users_repo
+
+# Ratings live at users/{uid}/ratings/{raterId}: {raterId, score, updatedAt}.
+# The user document keeps ratingSum/ratingCount so the average is O(1).
+RATINGS_SUBCOLLECTION = "ratings"
+
+
+class UserNotFound(Exception):
+    pass
+
+
+def rating_average(user_data: dict) -> Optional[float]:
+    """Average rating from the running aggregates, falling back to a legacy `ratings` array."""
+    count = user_data.get("ratingCount")
+    if count:
+        return user_data.get("ratingSum", 0.0) / count
+    legacy = user_data.get("ratings") or []
+    if legacy:
+        return sum(r.get("score", 0) for r in legacy) / len(legacy)
+    return None
+
+
+def _rate(user_id: str, rater_id: str, score: float) -> float:
+    user_ref = users_repo.document(user_id)
+    ratings = user_ref.collection(RATINGS_SUBCOLLECTION)
+    rating_ref = ratings.document(rater_id)
+
+    @firestore.transactional
+    def rate(transaction):
+        user_snap = user_ref.get(transaction=transaction)
+        if not user_snap.exists:
+            raise UserNotFound(user_id)
+        rating_snap = rating_ref.get(transaction=transaction)
+        user_data = user_snap.to_dict()
+        now = datetime.now()
+
+        total = user_data.get("ratingSum", 0.0)
+        count = user_data.get("ratingCount", 0)
+        previous = rating_snap.to_dict().get("score") if rating_snap.exists else None
+
+        updates = {}
+        legacy = user_data.get("ratings")
+        if legacy is not None:
+            # First rating since the move off the array: carry the old ratings over
+            scores = {r["raterId"]: r.get("score", 0) for r in legacy if r.get("raterId")}
+            total, count = float(sum(scores.values())), len(scores)
+            previous = scores.pop(rater_id, None)
+            for legacy_rater, legacy_score in scores.items():
+                transaction.set(ratings.document(legacy_rater), {
+                    "raterId": legacy_rater, "score": legacy_score, "updatedAt": now
+                })
+            updates["ratings"] = firestore.DELETE_FIELD
+
+        if previous is None:
+            total += score
+            count += 1
+        else:
+            total += score - previous
+
+        average = total / count
+        transaction.set(rating_ref, {"raterId": rater_id, "score": score, "updatedAt": now})
+        transaction.update(user_ref, {
+            **updates,
+            "ratingSum": total,
+            "ratingCount": count,
+            "trustScore": round(average, 1),
+        })
+        return average
+
+    return rate(db.transaction())
+
+
+async def rate_user(user_id: str, rater_id: str, score: float) -> float:
+    """Record `rater_id`'s score for `user_id` and return the new average."""
+    return await run_blocking(_rate, user_id, rater_id, score)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+logger = logging.getLogger(__name__)
+
+SOCKETIO_CHANNEL = "skillshare-socketio"
+
+
+class InMemoryPubSubManager(AsyncPubSubManager):
+    """
+    Pub/sub client manager over an in-process hub.
+
+    Stands in for Redis in tests and local runs: several AsyncServer instances
+    in one process behave like separate workers sharing a message queue.
+    """
+
+    name = "memory"
+    _hubs: Dict[str, list] = {}
+
+    def __init__(self, url: str = "memory://", channel: str = SOCKETIO_CHANNEL, write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._hubs.setdefault(channel, []).append(self._inbox)
+
+    async def _publish(self, data):
+        for inbox in self._hubs.get(self.channel, ()):
+            inbox.put_nowait(data)
+
+    async def _listen(self):
+        while True:
+            yield await self._inbox.get()
+
+
+def create_client_manager(url: Optional[str] = None):
+    """
+    Client manager for the Socket.IO server, from SOCKETIO_MESSAGE_QUEUE (or REDIS_URL).
+
+    redis://... -> AsyncRedisManager so emits reach sockets on every worker,
+    memory:// -> InMemoryPubSubManager, unset -> the default single-worker manager.
+    """
+    url = url or os.getenv("SOCKETIO_MESSAGE_QUEUE") or os.getenv("REDIS_URL")
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryPubSubManager(url, channel=SOCKETIO_CHANNEL)
+    return socketio.AsyncRedisManager(url, channel=SOCKETIO_CHANNEL)
+
+
+class PresenceTracker:
+    """
+    Connection counts per user and member counts per room, shared across workers.
+
+    Counts live in two Redis hashes when a URL is configured (HINCRBY keeps them
+    atomic across workers) and in local Counters otherwise. Each worker also
+    remembers its own contribution and withdraws it on shutdown, so a worker
+    restart does not leave users marked online.
+    """
+
+    USERS_KEY = "skillshare:presence:users"
+    ROOMS_KEY = "skillshare:presence:rooms"
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        self.url = url
+        self.client = client
+        self._local = {self.USERS_KEY: Counter(), self.ROOMS_KEY: Counter()}
+
+    @property
+    def shared(self) -> bool:
+        return self.client is not None or bool(self.url)
+
+    async def start(self):
+        if self.url and self.client is None:
+            import redis.asyncio as redis
+            self.client = redis.from_url(self.url)
+
+    async def _incr(self, key: str, field: str, amount: int):
+        local = self._local[key]
+        local[field] += amount
+        if local[field] <= 0:
+            del local[field]
+        if self.client is None:
+            return
+        try:
+            value = await self.client.hincrby(key, field, amount)
+            if value <= 0:
+                await self.client.hdel(key, field)
+        except Exception as e:
+            logger.warning(f"Presence update failed for {field}: {e}")
+
+    async def user_connected(self, user_id: str):
+        await self._incr(self.USERS_KEY, user_id, 1)
+
+    async def user_disconnected(self, user_id: str):
+        await self._incr(self.USERS_KEY, user_id, -1)
+
+    async def room_joined(self, room: str):
+        await self._incr(self.ROOMS_KEY, room, 1)
+
+    async def room_left(self, room: str):
+        await self._incr(self.ROOMS_KEY, room, -1)
+
+    async def room_size(self, room: str) -> int:
+        if self.client is None:
+            return self._local[self.ROOMS_KEY].get(room, 0)
+        value = await self.client.hget(self.ROOMS_KEY, room)
+        return int(value or 0)
+
+    async def online(self, user_ids: Iterable[str]) -> Dict[str, bool]:
+        """
+        Which of `user_ids` have a live connection on any worker.
+
+        A user counts as online when an authenticated socket is open for them or
+        a socket has joined their personal room (named after their user ID).
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        if self.client is None:
+            users, rooms = self._local[self.USERS_KEY], self._local[self.ROOMS_KEY]
+            return {uid: users.get(uid, 0) > 0 or rooms.get(uid, 0) > 0 for uid in user_ids}
+        try:
+            users = await self.client.hmget(self.USERS_KEY, user_ids)
+            rooms = await self.client.hmget(self.ROOMS_KEY, user_ids)
+        except Exception as e:
+            logger.warning(f"Presence lookup failed: {e}")
+            return {uid: False for uid in user_ids}
+        return {
+            uid: int(u or 0) > 0 or int(r or 0) > 0
+            for uid, u, r in zip(user_ids, users, rooms)
+        }
+
+    async def stop(self):
+        """Withdraw this worker's connections from the shared counts."""
+        if self.client is None:
+            return
+        for key, counts in self._local.items():
+            for field, count in list(counts.items()):
+                await self._incr(key, field, -count)
+
+    def stats(self) -> dict:
+        return {
+            "shared": self.shared,
+            "localUsers": len(self._local[self.USERS_KEY]),
+            "localRooms": len(self._local[self.ROOMS_KEY]),
+        }
+
+
+def create_presence_tracker():
+    url = os.getenv("SOCKETIO_MESSAGE_QUEUE") or os.getenv("REDIS_URL")
+    if url and url.startswith("redis"):
+        return PresenceTracker(url=url)
+    return PresenceTracker()
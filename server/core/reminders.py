@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from firebase_admin import firestore
+
+from core.firebase_config import db
+from core.repositories import run_blocking, sessions_repo
+
+logger = logging.getLogger(__name__)
+
+REMINDER_FIELDS = ["teacherId", "learnerId", "topic", "scheduledAt", "duration", "meetLink", "status", "reminderSentFor"]
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: `slots` buckets of `tick` seconds each.
+
+    An entry lives in the bucket for its due tick modulo the wheel size, so
+    insert and cancel are O(1) dict operations. advance() visits only the
+    buckets the clock has passed and pops the entries that are due; entries due
+    on a later revolution stay where they are.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 3600):
+        self.tick = tick
+        self.slots = slots
+        self._buckets: List[Dict[Hashable, tuple]] = [{} for _ in range(slots)]
+        self._where: Dict[Hashable, int] = {}
+        self._cursor = int(time.time() // tick)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def schedule(self, key: Hashable, due: float, payload=None):
+        """Schedule `key` at epoch time `due`, replacing any existing entry."""
+        self.cancel(key)
+        due_tick = max(int(due // self.tick), self._cursor)
+        slot = due_tick % self.slots
+        self._buckets[slot][key] = (due_tick, payload)
+        self._where[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+        del self._buckets[slot][key]
+        return True
+
+    def advance(self, now: Optional[float] = None) -> list:
+        """Move the clock to `now` and return (key, payload) for every entry now due."""
+        now_tick = int((time.time() if now is None else now) // self.tick)
+        due = []
+        # Never walk more than one revolution: that already visits every bucket
+        start = max(self._cursor, now_tick - self.slots + 1)
+        for current in range(start, now_tick + 1):
+            bucket = self._buckets[current % self.slots]
+            if not bucket:
+                continue
+            for key, (due_tick, payload) in list(bucket.items()):
+                if due_tick <= now_tick:
+                    del bucket[key]
+                    del self._where[key]
+                    due.append((key, payload))
+        self._cursor = now_tick + 1
+        return due
+
+
+def _as_utc(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    # Naive datetimes are stored by Firestore as UTC, so read them back the same way
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ReminderScheduler:
+    """
+    Fires a reminder `lead` before each SCHEDULED session starts.
+
+    Upcoming sessions are loaded once at startup and then kept current by
+    schedule()/cancel() calls from the session write paths. When a reminder
+    comes due, the session is re-read in a transaction that records
+    `reminderSentFor` (the start time, in epoch seconds, it was sent for) so
+    that only one worker sends it, a rescheduled session is reminded again, and
+    a stale entry for a session that moved is re-armed instead of sent.
+    """
+
+    def __init__(
+        self,
+        on_due: Callable[[str, dict], Awaitable[None]],
+        lead: timedelta = timedelta(hours=24),
+        tick: float = 30.0,
+        slots: int = 2880,
+    ):
+        self.on_due = on_due
+        self.lead = lead
+        self.wheel = TimingWheel(tick=tick, slots=slots)
+        self._task: Optional[asyncio.Task] = None
+        self._sending = set()
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def schedule(self, session_id: str, session_data: dict):
+        """Arm (or re-arm) the reminder for a session, or cancel it if none is due."""
+        starts_at = _as_utc(session_data.get("scheduledAt"))
+        now = datetime.now(timezone.utc)
+        if (
+            session_data.get("status") != "SCHEDULED"
+            or starts_at is None
+            or starts_at <= now
+            or session_data.get("reminderSentFor") == int(starts_at.timestamp())
+        ):
+            self.cancel(session_id)
+            return
+        self.wheel.schedule(session_id, (starts_at - self.lead).timestamp(), starts_at)
+
+    def cancel(self, session_id: str):
+        self.wheel.cancel(session_id)
+
+    def _claim(self, session_id: str):
+        ref = sessions_repo.document(session_id)
+
+        @firestore.transactional
+        def claim(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return None, None
+            data = snapshot.to_dict()
+            starts_at = _as_utc(data.get("scheduledAt"))
+            if data.get("status") != "SCHEDULED" or starts_at is None:
+                return None, data
+            if data.get("reminderSentFor") == int(starts_at.timestamp()):
+                return None, data
+            if datetime.now(timezone.utc) < starts_at - self.lead:
+                # Moved later since we armed it; let the caller re-arm
+                return None, data
+            transaction.update(ref, {"reminderSentFor": int(starts_at.timestamp())})
+            return data, data
+
+        return claim(db.transaction())
+
+    async def _fire(self, session_id: str):
+        try:
+            claimed, current = await run_blocking(self._claim, session_id)
+            if claimed is None:
+                self.skipped += 1
+                if current is not None:
+                    self.schedule(session_id, current)
+                return
+            await self.on_due(session_id, claimed)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Failed to send reminder for session {session_id}: {e}")
+
+    def _spawn(self, session_id: str):
+        task = asyncio.create_task(self._fire(session_id))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def load(self):
+        """Arm reminders for every upcoming SCHEDULED session (one projected query)."""
+        query = (
+            sessions_repo.where("status", "==", "SCHEDULED")
+            .where("scheduledAt", ">", datetime.now(timezone.utc))
+            .select(REMINDER_FIELDS)
+        )
+        docs = await sessions_repo.fetch(query)
+        for doc in docs:
+            self.schedule(doc.id, doc.to_dict())
+        logger.info(f"Armed {len(self.wheel)} session reminders")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            for session_id, _ in self.wheel.advance():
+                self._spawn(session_id)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to load session reminders: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, *self._sending, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.wheel),
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
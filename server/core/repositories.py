@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from core.firebase_config import db
+
+# Managed pool for blocking Firestore round-trips, so handlers never stall the event loop
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FIRESTORE_MAX_WORKERS", "32")),
+    thread_name_prefix="firestore",
+)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking Firestore call on the managed executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+def batch():
+    """New WriteBatch; stage writes on it and `await commit(...)` once."""
+    return db.batch()
+
+
+async def commit(batch):
+    """Commit a WriteBatch without blocking the event loop."""
+    return await run_blocking(batch.commit)
+
+
+def shutdown():
+    executor.shutdown(wait=False)
+
+
+class Repository:
+    """
+    Async data access for one Firestore collection.
+
+    Building references and queries is pure client-side work and stays
+    synchronous; every network round-trip is awaited on the managed executor.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self.collection = db.collection(collection_name)
+
+    def document(self, doc_id: Optional[str] = None):
+        return self.collection.document(doc_id) if doc_id else self.collection.document()
+
+    def where(self, field: str, op: str, value):
+        return self.collection.where(field, op, value)
+
+    async def get(self, doc_id: str):
+        return await run_blocking(self.document(doc_id).get)
+
+    async def get_many(self, doc_ids: Iterable[str], field_paths: Optional[List[str]] = None) -> list:
+        refs = [self.document(doc_id) for doc_id in doc_ids]
+        if not refs:
+            return []
+        return await run_blocking(lambda: list(db.get_all(refs, field_paths=field_paths)))
+
+    async def set(self, doc_id: str, data: dict, merge: bool = False):
+        return await run_blocking(self.document(doc_id).set, data, merge=merge)
+
+    async def update(self, doc_id: str, data: dict):
+        return await run_blocking(self.document(doc_id).update, data)
+
+    async def delete(self, doc_id: str):
+        return await run_blocking(self.document(doc_id).delete)
+
+    async def add(self, data: dict):
+        """Add a document with a generated ID and return its reference."""
+        _, doc_ref = await run_blocking(self.collection.add, data)
+        return doc_ref
+
+    async def fetch(self, query=None) -> list:
+        """Run a query (or scan the collection) and return all snapshots."""
+        query = self.collection if query is None else query
+        return await run_blocking(lambda: list(query.stream()))
+
+    async def stream(self, query=None, chunk_size: int = 500):
+        """
+        Yield the snapshots of a query as they arrive, without collecting them.
+
+        The blocking Firestore iterator is advanced on the managed executor one
+        chunk at a time, so at most `chunk_size` snapshots are held at once.
+        """
+        query = self.collection if query is None else query
+        docs = await run_blocking(query.stream)
+        while True:
+            chunk = await run_blocking(lambda: list(itertools.islice(docs, chunk_size)))
+            if not chunk:
+                return
+            for doc in chunk:
+                yield doc
+
+    async def exists(self, query) -> bool:
+        return bool(await self.fetch(query.limit(1)))
+
+
+users_repo = Repository("users")
+sessions_repo = Repository("sessions")
+messages_repo = Repository("messages")
+matches_repo = Repository("matches")
+projects_repo = Repository("projects")
+saved_matches_repo = Repository("savedMatches")
+tasks_repo = Repository("tasks")
@@ -0,0 +1,71 @@
+import functools
+from datetime import date
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any):
+    # orjson only handles exact datetime types natively; Firestore returns a subclass
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "dict"):
+        return value.dict()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _missing(field) -> Callable[[], Any]:
+    factory = getattr(field, "default_factory", None)
+    if factory is not None:
+        return factory
+    default = getattr(field, "default", None)
+    # Required fields have no default (pydantic v2 uses a sentinel): emit null
+    if type(default).__name__ == "PydanticUndefinedType" or default is Ellipsis:
+        default = None
+    return lambda: default
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(model) -> Tuple[Tuple[str, Callable[[], Any]], ...]:
+    fields = model.model_fields if hasattr(model, "model_fields") else model.__fields__
+    return tuple((name, _missing(field)) for name, field in fields.items())
+
+
+def field_names(model) -> List[str]:
+    """The model's field names, in declaration order."""
+    return [name for name, _ in _fields(model)]
+
+
+def trusted(model, data: dict) -> dict:
+    """
+    The response shape of `model` for a document we wrote ourselves.
+
+    Keeps exactly the model's fields and fills missing ones from the model
+    defaults, like `response_model` does, but without validating or coercing
+    the values: anything in our own collections went through the model on the
+    way in.
+    """
+    return {name: data[name] if name in data else missing() for name, missing in _fields(model)}
+
+
+def trusted_list(model, records: Iterable[dict]) -> List[dict]:
+    return [trusted(model, data) for data in records]
+
+
+def trusted_response(model, records: Iterable[dict], headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """
+    A list endpoint's response, skipping model construction and response_model
+    re-validation. Being a Response, it must carry its own headers.
+    """
+    return FastJSONResponse(trusted_list(model, records), headers=headers)
@@ -0,0 +1,108 @@
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+
+def normalize_terms(terms: Iterable[str]) -> Set[str]:
+    """Lowercase and strip skill/learning terms, dropping empty ones."""
+    return {t.strip().lower() for t in terms or [] if isinstance(t, str) and t.strip()}
+
+
+class SkillIndex:
+    """
+    In-process inverted index from lowercased skill / learning term to user IDs.
+
+    Built once at startup from the users collection and kept up to date from the
+    write paths, so match suggestions only score users sharing at least one term
+    instead of streaming the whole collection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._teachers: Dict[str, Set[str]] = {}  # skill term -> users who teach it
+        self._learners: Dict[str, Set[str]] = {}  # learning term -> users who want it
+        self._users: Dict[str, Tuple[Set[str], Set[str]]] = {}  # user_id -> (skills, learning)
+        self.ready = False
+
+    def __len__(self):
+        return len(self._users)
+
+    def build(self, users: Iterable[Tuple[str, dict]]):
+        """Rebuild the index from (user_id, user_data) pairs."""
+        teachers, learners, entries = {}, {}, {}
+        for user_id, user_data in users:
+            skills = normalize_terms(user_data.get("skills", []))
+            learning = normalize_terms(user_data.get("learning", []))
+            entries[user_id] = (skills, learning)
+            for term in skills:
+                teachers.setdefault(term, set()).add(user_id)
+            for term in learning:
+                learners.setdefault(term, set()).add(user_id)
+
+        with self._lock:
+            self._teachers, self._learners, self._users = teachers, learners, entries
+            self.ready = True
+
+    def upsert(self, user_id: str, skills: Iterable[str], learning: Iterable[str]):
+        """Add or replace a user's terms."""
+        skills = normalize_terms(skills)
+        learning = normalize_terms(learning)
+        with self._lock:
+            self._unlink(user_id)
+            self._users[user_id] = (skills, learning)
+            for term in skills:
+                self._teachers.setdefault(term, set()).add(user_id)
+            for term in learning:
+                self._learners.setdefault(term, set()).add(user_id)
+
+    def remove(self, user_id: str):
+        with self._lock:
+            self._unlink(user_id)
+            self._users.pop(user_id, None)
+
+    def _unlink(self, user_id: str):
+        old = self._users.get(user_id)
+        if not old:
+            return
+        for postings, terms in ((self._teachers, old[0]), (self._learners, old[1])):
+            for term in terms:
+                ids = postings.get(term)
+                if ids is not None:
+                    ids.discard(user_id)
+                    if not ids:
+                        del postings[term]
+
+    def top_matches(
+        self,
+        wants_to_learn: Set[str],
+        user_teaches: Set[str],
+        score: Callable[[Set[str], Set[str], Set[str], Set[str]], int],
+        limit: int,
+        exclude: str = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        Return up to `limit` (user_id, score) pairs with a positive score, best first.
+
+        Candidates are users who teach something in `wants_to_learn` or want to learn
+        something in `user_teaches`; ties keep user ID order like a collection scan.
+        """
+        with self._lock:
+            candidates = set()
+            for term in wants_to_learn:
+                candidates.update(self._teachers.get(term, ()))
+            for term in user_teaches:
+                candidates.update(self._learners.get(term, ()))
+            candidates.discard(exclude)
+
+            scored = []
+            for user_id in sorted(candidates):
+                skills, learning = self._users[user_id]
+                match_percentage = score(wants_to_learn, user_teaches, skills, learning)
+                if match_percentage > 0:
+                    scored.append((user_id, match_percentage))
+
+        # nlargest is equivalent to a stable sort + slice, without sorting everything
+        return heapq.nlargest(limit, scored, key=lambda item: item[1])
+
+
+skill_index = SkillIndex()
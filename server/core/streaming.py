@@ -0,0 +1,36 @@
+import json
+from typing import AsyncIterable, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True when the client opted into streaming with `Accept: application/x-ndjson`."""
+    accept = request.headers.get("accept", "")
+    return any(part.split(";")[0].strip() == NDJSON_MEDIA_TYPE for part in accept.split(","))
+
+
+async def _ndjson_lines(records: AsyncIterable, transform: Optional[Callable]):
+    async for record in records:
+        if transform is not None:
+            record = transform(record)
+            if record is None:
+                continue
+        yield json.dumps(jsonable_encoder(record), separators=(",", ":")) + "\n"
+
+
+def ndjson_response(records: AsyncIterable, transform: Optional[Callable] = None,
+                    headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Stream `records` as newline-delimited JSON, one line per record.
+
+    Each record is (optionally) mapped through `transform` and serialized as it
+    arrives, so peak memory is one record plus whatever the source buffers,
+    and the first line goes out before the last record is read. A `transform`
+    returning None drops the record.
+    """
+    return StreamingResponse(_ndjson_lines(records, transform), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional
+
+import firebase_admin
+from firebase_admin import auth
+
+from core.cache import TTLCache
+from core.repositories import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Google's x509 certificates for Firebase ID tokens
+ID_TOKEN_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+
+class PublicKeyCache:
+    """
+    Firebase ID token signing certificates, refreshed in the background.
+
+    Certificates are kept until the Cache-Control max-age Google sends and a
+    background task re-fetches them shortly before that, so request paths never
+    wait on a certificate download.
+    """
+
+    def __init__(self, url: str = ID_TOKEN_CERTS_URL, refresh_margin: float = 300.0):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.certs: Dict[str, str] = {}
+        self.expires_at = 0.0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def fresh(self) -> bool:
+        return bool(self.certs) and time.monotonic() < self.expires_at
+
+    def refresh(self):
+        import requests
+
+        response = requests.get(self.url, timeout=10)
+        response.raise_for_status()
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else 3600
+        self.certs = response.json()
+        self.expires_at = time.monotonic() + max_age
+        self.refreshes += 1
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await run_blocking(self.refresh)
+                delay = max(self.expires_at - time.monotonic() - self.refresh_margin, 60)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"Failed to refresh Firebase public keys: {e}")
+                delay = 30
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class TokenVerifier:
+    """
+    Verifies Firebase ID tokens and caches the decoded claims until the token expires.
+
+    Tokens are keyed by their SHA-256 hash so raw credentials are never held in
+    memory. Misses are verified against the background-refreshed public keys,
+    falling back to firebase_admin when the keys or project ID are unavailable.
+    """
+
+    def __init__(self, max_entries: int = 50000, clock_skew: int = 5):
+        self.cache = TTLCache("verified_tokens", max_entries=max_entries, max_bytes=32 * 1024 * 1024, ttl=3600)
+        self.keys = PublicKeyCache()
+        self.clock_skew = clock_skew
+        self.verifications = 0
+        self.failures = 0
+        self.verify_seconds = 0.0
+        self._project_id = None
+
+    @property
+    def project_id(self) -> Optional[str]:
+        if self._project_id is None:
+            try:
+                self._project_id = firebase_admin.get_app().project_id
+            except Exception:
+                self._project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+        return self._project_id
+
+    async def verify(self, token: str) -> dict:
+        """Return the decoded claims for `token`, raising on an invalid token."""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        claims = self.cache.get(key)
+        if claims is not None:
+            return claims
+
+        start = time.perf_counter()
+        try:
+            if self.keys.fresh and self.project_id:
+                claims = self._verify_with_cached_keys(token)
+            else:
+                claims = await run_blocking(auth.verify_id_token, token)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.verifications += 1
+            self.verify_seconds += time.perf_counter() - start
+
+        ttl = claims.get("exp", 0) - time.time() - self.clock_skew
+        self.cache.set(key, claims, ttl=ttl)
+        return claims
+
+    def _verify_with_cached_keys(self, token: str) -> dict:
+        """Same checks as firebase_admin.auth.verify_id_token, without fetching certificates."""
+        from google.auth import jwt
+
+        project_id = self.project_id
+        claims = jwt.decode(token, certs=self.keys.certs, audience=project_id)
+        if claims.get("iss") != f"https://securetoken.google.com/{project_id}":
+            raise ValueError("Firebase ID token has incorrect 'iss' claim")
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise ValueError("Firebase ID token has an invalid 'sub' claim")
+        auth_time = claims.get("auth_time")
+        if auth_time is None:
+            raise ValueError("Firebase ID token has no 'auth_time' claim")
+        if auth_time > time.time():
+            raise ValueError("Firebase ID token has an 'auth_time' claim in the future")
+        claims["uid"] = subject
+        return claims
+
+    def stats(self) -> dict:
+        return {
+            "verifications": self.verifications,
+            "failures": self.failures,
+            "avgVerifyMs": round(self.verify_seconds / self.verifications * 1000, 3) if self.verifications else 0.0,
+            "cache": self.cache.stats(),
+            "publicKeys": {
+                "count": len(self.keys.certs),
+                "fresh": self.keys.fresh,
+                "refreshes": self.keys.refreshes,
+                "refreshFailures": self.keys.refresh_failures,
+            },
+        }
+
+
+token_verifier = TokenVerifier(max_entries=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "50000")))
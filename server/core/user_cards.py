@@ -0,0 +1,79 @@
+import os
+from typing import Dict, Iterable, Optional
+
+from core.cache import TTLCache
+from core.repositories import users_repo
+
+# Profile fields the card views (chat contacts, session partners, member lists, emails) render
+CARD_FIELDS = ["name", "avatar", "email", "experienceLevel"]
+
+
+class UserCard:
+    """
+    The handful of profile fields shown wherever another user is referenced.
+
+    Slotted, so a cached card costs a few hundred bytes instead of the several
+    kilobytes of a full profile dict. `get` mirrors dict.get so call sites that
+    used to read a profile dict work unchanged.
+    """
+
+    __slots__ = ("id", "name", "avatar", "email", "experienceLevel")
+
+    def __init__(self, user_id: str, data: dict):
+        self.id = user_id
+        self.name = data.get("name")
+        self.avatar = data.get("avatar")
+        self.email = data.get("email")
+        self.experienceLevel = data.get("experienceLevel")
+
+    def get(self, field: str, default=None):
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+
+class UserCardStore:
+    """
+    Read-through cache of UserCards.
+
+    Misses for a whole batch are filled by one projected `get_all`, so only the
+    card fields leave Firestore. Entries are dropped on "user" invalidations.
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    async def get(self, user_id: str) -> Optional[UserCard]:
+        return (await self.get_many([user_id])).get(user_id)
+
+    async def get_many(self, user_ids: Iterable[str]) -> Dict[str, UserCard]:
+        """Cards for the users that exist, keyed by user ID."""
+        found: Dict[str, UserCard] = {}
+        missing_ids = []
+        for user_id in dict.fromkeys(uid for uid in user_ids if uid):
+            card = self.cache.get(user_id)
+            if card is not None:
+                found[user_id] = card
+            else:
+                missing_ids.append(user_id)
+
+        if missing_ids:
+            for doc in await users_repo.get_many(missing_ids, field_paths=CARD_FIELDS):
+                if doc.exists:
+                    card = UserCard(doc.id, doc.to_dict())
+                    found[doc.id] = card
+                    self.cache.set(doc.id, card)
+        return found
+
+    def invalidate(self, user_id: str):
+        self.cache.delete(user_id)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+user_cards = UserCardStore(TTLCache(
+    "user_cards",
+    max_entries=int(os.getenv("USER_CARD_CACHE_MAX_ENTRIES", "100000")),
+    max_bytes=int(os.getenv("USER_CARD_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("USER_CARD_CACHE_TTL", "300")),
+))
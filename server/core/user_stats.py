@@ -0,0 +1,115 @@
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from firebase_admin import firestore
+
+from core import repositories
+from core.ratings import rating_average
+from core.repositories import users_repo
+from core.user_cards import user_cards
+
+logger = logging.getLogger(__name__)
+
+# Counters kept on the user document and incremented on the write paths:
+#   messageCount       messages sent (anything but "system")
+#   completedSessions  sessions moved to COMPLETED
+#   projectCount       projects the user is a member of
+#   dailyCounts        {"YYYY-MM-DD": {"sessions": n, "matches": n}}, for the daily goal;
+#                      UTC days, today and later only (older buckets are pruned)
+CONFIRMED_SESSION_STATUSES = ("SCHEDULED", "COMPLETED")
+
+
+def day_key(value=None) -> Optional[str]:
+    """The dailyCounts key (UTC day) for a date/datetime/ISO string (today when omitted)."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        # Aware values are read back from Firestore in UTC whatever offset they were written with
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return value.isoformat() if isinstance(value, date) else None
+
+
+def stage_counters(batch, user_id: str, counters: Optional[Dict[str, int]] = None,
+                   daily: Optional[Dict[str, Dict[str, int]]] = None):
+    """
+    Stage atomic increments of a user's counters on `batch`.
+
+    Staged as an update, so the commit fails with NotFound instead of creating
+    a stub document for an unknown ID; only stage counters for users known to
+    exist (see `known_users`).
+    """
+    data = {field: firestore.Increment(n) for field, n in (counters or {}).items() if n}
+    # Past days are never read again, so changes to them are dropped rather than stored
+    today = day_key()
+    for day, kinds in (daily or {}).items():
+        if day >= today:
+            data.update({f"dailyCounts.{day}.{kind}": firestore.Increment(n) for kind, n in kinds.items() if n})
+    if data:
+        batch.update(users_repo.document(user_id), data)
+    return bool(data)
+
+
+async def known_users(user_ids: Iterable[str]) -> set:
+    """The IDs among `user_ids` that have a user document; unknown ones are logged."""
+    user_ids = {uid for uid in user_ids if isinstance(uid, str) and uid and uid != "system"}
+    known = set(await user_cards.get_many(user_ids)) if user_ids else set()
+    if user_ids - known:
+        logger.warning(f"Dropping counters for unknown users: {sorted(user_ids - known)}")
+    return known
+
+
+async def increment(user_ids: Iterable[str], counters: Optional[Dict[str, int]] = None,
+                    daily: Optional[Dict[str, Dict[str, int]]] = None):
+    """Apply the same counter increments to several users in one commit; unknown IDs are skipped."""
+    batch = repositories.batch()
+    staged = [stage_counters(batch, uid, counters, daily) for uid in await known_users(user_ids)]
+    if any(staged):
+        await repositories.commit(batch)
+
+
+def session_daily_changes(before: Optional[dict], after: Optional[dict]) -> Dict[str, Dict[str, int]]:
+    """dailyCounts changes for a session moving from `before` to `after` (either may be None)."""
+    changes: Dict[str, int] = {}
+    for session, sign in ((before, -1), (after, 1)):
+        if session and session.get("status") in CONFIRMED_SESSION_STATUSES:
+            day = day_key(session.get("scheduledAt"))
+            if day:
+                changes[day] = changes.get(day, 0) + sign
+    return {day: {"sessions": n} for day, n in changes.items() if n}
+
+
+def stale_daily_counts(user_data: dict, day=None) -> Dict[str, object]:
+    """DELETE_FIELD markers for the dailyCounts buckets before `day` (today), for a merge set."""
+    today = day_key(day)
+    return {key: firestore.DELETE_FIELD for key in user_data.get("dailyCounts", {}) if key < today}
+
+
+def daily_goal_progress(user_data: dict, day=None) -> int:
+    """Confirmed sessions scheduled for the day plus mutual matches made that day."""
+    today = user_data.get("dailyCounts", {}).get(day_key(day), {})
+    return today.get("sessions", 0) + today.get("matches", 0)
+
+
+def trust_score(user_data: dict) -> float:
+    """Ratings average plus capped activity bonuses, on a 0-100 scale."""
+    base_trust = rating_average(user_data) or 0.0
+
+    activity_trust = 0.0
+    # Completed sessions: +0.5 per session (max +10)
+    activity_trust += min(user_data.get("completedSessions", 0) * 0.5, 10)
+    # Projects joined: +1 per project (max +5)
+    activity_trust += min(user_data.get("projectCount", 0) * 1.0, 5)
+    # Streak bonus: +0.2 per week of streak (max +5)
+    activity_trust += min((user_data.get("streak", 0) // 7) * 0.2, 5)
+    # Message activity: +0.1 per 10 messages (max +3)
+    activity_trust += min((user_data.get("messageCount", 0) // 10) * 0.1, 3)
+
+    return min(base_trust + activity_trust, 100.0)
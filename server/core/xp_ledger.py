@@ -0,0 +1,151 @@
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, Conflict, FailedPrecondition, NotFound
+
+from core import repositories
+from core.firebase_config import db
+from core.repositories import Repository, run_blocking, users_repo
+
+logger = logging.getLogger(__name__)
+
+# Append-only record of every stat award: {userId, reason, sourceId, deltas, createdAt}
+xp_ledger_repo = Repository("xpLedger")
+
+XP_PER_LEVEL = 100
+
+
+def level_for(xp: int) -> int:
+    """Level is derived from xp: every 100 XP is one level."""
+    return (int(xp or 0) // XP_PER_LEVEL) + 1
+
+
+class Award:
+    __slots__ = ("user_id", "reason", "deltas", "source_id", "fields")
+
+    def __init__(self, user_id: str, reason: str, deltas: Dict[str, float],
+                 source_id: Optional[str] = None, fields: Optional[dict] = None):
+        self.user_id = user_id
+        self.reason = reason
+        self.deltas = {k: v for k, v in deltas.items() if v}
+        self.source_id = source_id
+        # Plain values written alongside the increments (e.g. lastCheckIn)
+        self.fields = fields or {}
+
+    @property
+    def entry_id(self) -> Optional[str]:
+        if self.source_id is None:
+            return None
+        return f"{self.reason}:{self.source_id}:{self.user_id}"
+
+
+def stage_award(batch, award: Award):
+    """
+    Stage a user's stat increments and their ledger entry on `batch`.
+
+    Awards with a source_id get a deterministic ledger ID and are staged with
+    create(), so committing the same award twice fails instead of counting it
+    twice. The user is updated rather than merge-set, so an award for an
+    unknown user fails the commit with NotFound instead of creating a stub
+    user document.
+    """
+    user_changes = {field: firestore.Increment(n) for field, n in award.deltas.items()}
+    user_changes.update(award.fields)
+    batch.update(users_repo.document(award.user_id), user_changes)
+
+    entry = {
+        "userId": award.user_id,
+        "reason": award.reason,
+        "sourceId": award.source_id,
+        "deltas": award.deltas,
+        "createdAt": firestore.SERVER_TIMESTAMP,
+    }
+    if award.entry_id is None:
+        batch.set(xp_ledger_repo.document(), entry)
+    else:
+        batch.create(xp_ledger_repo.document(award.entry_id), entry)
+
+
+class XPLedger:
+    """Applies awards as atomic server-side increments, all of a call's awards in one commit."""
+
+    def __init__(self, max_level_attempts: int = 5):
+        self.max_level_attempts = max_level_attempts
+        self.committed = 0
+        self.duplicates = 0
+        self.level_ups = 0
+
+    async def apply(self, awards: Iterable[Award]) -> bool:
+        """Commit `awards` together; returns False if they were already applied or a user does not exist."""
+        awards = list(awards)
+        if not awards:
+            return True
+        batch = repositories.batch()
+        for award in awards:
+            stage_award(batch, award)
+        try:
+            await repositories.commit(batch)
+        except (AlreadyExists, Conflict):
+            self.duplicates += 1
+            logger.info(f"Skipping already-applied awards: {[a.entry_id for a in awards]}")
+            return False
+        except NotFound as e:
+            logger.warning(f"Not applying awards for a missing user ({[a.user_id for a in awards]}): {e}")
+            return False
+        self.committed += len(awards)
+        return True
+
+    def _raise_level(self, user_id: str) -> Optional[int]:
+        """Compare-and-set `level` from the committed xp; returns the new level if this call raised it."""
+        ref = users_repo.document(user_id)
+        for _ in range(self.max_level_attempts):
+            snapshot = ref.get(field_paths=["xp", "level"])
+            if not snapshot.exists:
+                return None
+            data = snapshot.to_dict()
+            level = level_for(data.get("xp", 0))
+            if level <= (data.get("level") or 1):
+                return None
+            try:
+                # Only if nothing changed since the read, so a stale xp can never lower the level
+                ref.update({"level": level}, option=db.write_option(last_update_time=snapshot.update_time))
+                return level
+            except FailedPrecondition as e:
+                logger.debug(f"Level update for {user_id} raced another write, re-reading: {e}")
+        logger.warning(f"Gave up updating level for {user_id} after {self.max_level_attempts} attempts")
+        return None
+
+    async def settle_levels(self, user_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        Bring the stored `level` in line with the committed xp of `user_ids`.
+
+        Call after applying awards that change xp. Returns the users whose level
+        this call raised, with their new level; when several workers settle the
+        same user at once exactly one of them sees each raise.
+        """
+        raised = {}
+        for user_id in dict.fromkeys(uid for uid in user_ids if uid):
+            level = await run_blocking(self._raise_level, user_id)
+            if level is not None:
+                raised[user_id] = level
+        self.level_ups += len(raised)
+        return raised
+
+    async def totals(self, user_id: str) -> Dict[str, float]:
+        """Replay a user's ledger: the sum of every delta ever awarded to them."""
+        totals: Counter = Counter()
+        for doc in await xp_ledger_repo.fetch(xp_ledger_repo.where("userId", "==", user_id)):
+            totals.update(doc.to_dict().get("deltas", {}))
+        return dict(totals)
+
+    def stats(self) -> dict:
+        return {"committed": self.committed, "duplicates": self.duplicates, "levelUps": self.level_ups}
+
+
+xp_ledger = XPLedger()
+
+
+def awards_for(user_ids: List[str], reason: str, deltas: Dict[str, float], source_id: Optional[str] = None) -> List[Award]:
+    return [Award(uid, reason, deltas, source_id) for uid in user_ids if uid]
@@ -1,16 +1,39 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Request
+from fastapi import FastAPI, HTTPException, Depends, Query, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import socketio
-from core.firebase_config import db
-from core.deps import get_current_user
+from core.deps import get_current_user, authenticate_socket
+from core.token_verifier import token_verifier
+from core.pagination import encode_cursor, decode_cursor, clamp_page_size
+from core.streaming import wants_ndjson, ndjson_response
+from core.serialization import FastJSONResponse, field_names, trusted, trusted_response
+from core.conversations import record_message, stage_message, fetch_conversations, mark_read
+from core.message_writer import MessageWriter, MessageQueueFull
+from core.email_outbox import EmailOutbox, create_transport_from_env
+from core.reminders import ReminderScheduler
+from core import user_stats
+from core.user_stats import daily_goal_progress, trust_score
+from core import ratings
+from core.xp_ledger import xp_ledger, Award, awards_for, level_for
+from core.realtime import create_client_manager, create_presence_tracker
+from core.notifier import Notifier
+from core.skill_index import skill_index, normalize_terms
+from core.project_index import project_index
+from core.leaderboard import leaderboard, LEADERBOARD_FIELDS
+from core.cache import TTLCache
+from core.user_cards import user_cards
+from core.invalidation import invalidation_bus
+from core import repositories
+from core.repositories import (
+    users_repo, sessions_repo, messages_repo, matches_repo,
+    projects_repo, saved_matches_repo, tasks_repo, run_blocking, Repository,
+)
 import skillshare_data_models
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
 import random
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import logging
 import time
 from google.cloud.exceptions import GoogleCloudError
@@ -44,55 +67,71 @@ logger.info("SkillShare API starting up...")
 
 app = FastAPI(title="SkillShare API", version="1.0.0")
 
-# Thread pool for parallel database queries
-executor = ThreadPoolExecutor(max_workers=10)
-
-# PHASE 3: In-memory cache with TTL
-# Cache structure: {key: (data, timestamp)}
-user_profile_cache = {}
-session_cache = {}
+# PHASE 3: Bounded in-memory LRU cache with TTL (see core/cache.py)
 CACHE_TTL = 300  # 5 minutes in seconds
+user_profile_cache = TTLCache(
+    "user_profiles",
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("USER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=CACHE_TTL,
+)
+session_cache = TTLCache(
+    "sessions",
+    max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(os.getenv("SESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=CACHE_TTL,
+)
 
-def get_cached_user(user_id: str):
+async def get_cached_user(user_id: str):
     """Get user from cache or database with automatic cache refresh"""
-    if user_id in user_profile_cache:
-        cached_data, timestamp = user_profile_cache[user_id]
-        # Check if cache is still valid
-        if (datetime.now() - timestamp).total_seconds() < CACHE_TTL:
-            return cached_data
+    cached_data = user_profile_cache.get(user_id)
+    if cached_data is not None:
+        return cached_data
     
     # Cache miss or expired - fetch from database
-    user_doc = db.collection("users").document(user_id).get()
+    user_doc = await users_repo.get(user_id)
     if user_doc.exists:
         user_data = user_doc.to_dict()
-        user_profile_cache[user_id] = (user_data, datetime.now())
+        user_profile_cache.set(user_id, user_data)
         return user_data
     return None
 
 def invalidate_user_cache(user_id: str):
-    """Invalidate cache when user data is updated"""
-    if user_id in user_profile_cache:
-        del user_profile_cache[user_id]
+    """Invalidate cache when user data is updated (broadcast to every worker)"""
+    invalidation_bus.publish("user", user_id)
 
 def get_cached_sessions(user_id: str):
     """Get sessions from cache or database"""
-    cache_key = f"sessions_{user_id}"
-    if cache_key in session_cache:
-        cached_data, timestamp = session_cache[cache_key]
-        if (datetime.now() - timestamp).total_seconds() < CACHE_TTL:
-            return cached_data
-    return None
+    return session_cache.get(f"sessions_{user_id}")
 
 def set_cached_sessions(user_id: str, sessions_data):
     """Store sessions in cache"""
-    cache_key = f"sessions_{user_id}"
-    session_cache[cache_key] = (sessions_data, datetime.now())
+    session_cache.set(f"sessions_{user_id}", sessions_data)
 
 def invalidate_session_cache(user_id: str):
-    """Invalidate session cache when sessions are updated"""
-    cache_key = f"sessions_{user_id}"
-    if cache_key in session_cache:
-        del session_cache[cache_key]
+    """Invalidate session cache when sessions are updated (broadcast to every worker)"""
+    invalidation_bus.publish("sessions", user_id)
+
+# Every worker applies invalidations published by any worker to its own caches
+invalidation_bus.subscribe("user", user_profile_cache.delete)
+invalidation_bus.subscribe("user", user_cards.invalidate)
+invalidation_bus.subscribe("sessions", lambda user_id: session_cache.delete(f"sessions_{user_id}"))
+
+@app.on_event("startup")
+async def start_invalidation_bus():
+    await invalidation_bus.start()
+
+@app.on_event("shutdown")
+async def stop_invalidation_bus():
+    await invalidation_bus.stop()
+
+@app.on_event("startup")
+async def start_token_key_refresh():
+    token_verifier.keys.start()
+
+@app.on_event("shutdown")
+async def stop_token_key_refresh():
+    await token_verifier.keys.stop()
 
 # CORS
 app.add_middleware(
@@ -104,8 +143,115 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Before-Cursor", "X-After-Cursor", "X-Has-More", "X-Next-Cursor"],
 )
 
+# Profile fields the in-memory user indexes are built from
+USER_INDEX_FIELDS = ["skills", "learning"] + LEADERBOARD_FIELDS
+
+def load_user_indexes():
+    """Build the skill index and leaderboard from a single projected scan of users"""
+    docs = users_repo.collection.select(USER_INDEX_FIELDS).stream()
+    users = [(doc.id, doc.to_dict()) for doc in docs]
+    skill_index.build(users)
+    leaderboard.build(users)
+    logger.info(f"User indexes built for {len(users)} users")
+
+async def refresh_user_indexes(user_id: str):
+    """Re-read one user's indexed fields after a profile write on any worker"""
+    try:
+        doc = (await users_repo.get_many([user_id], field_paths=USER_INDEX_FIELDS))[0]
+    except Exception as e:
+        logger.error(f"Failed to refresh user {user_id} in indexes: {e}")
+        return
+    if doc.exists:
+        user_data = doc.to_dict()
+        skill_index.upsert(user_id, user_data.get("skills", []), user_data.get("learning", []))
+        # Absolute values from the committed document, so deltas applied on other workers land too
+        leaderboard.upsert(user_id, {field: user_data.get(field) for field in LEADERBOARD_FIELDS})
+    else:
+        skill_index.remove(user_id)
+        leaderboard.remove(user_id)
+
+_user_refreshes = {}
+_stale_user_refreshes = set()
+
+async def _refresh_user_until_current(user_id: str):
+    while True:
+        _stale_user_refreshes.discard(user_id)
+        await refresh_user_indexes(user_id)
+        if user_id not in _stale_user_refreshes:
+            return
+
+def schedule_user_index_refresh(user_id: str):
+    """Coalesce "user" invalidations into at most one in-flight re-read per user"""
+    if not (skill_index.ready or leaderboard.ready):
+        return  # The pending full build will pick the change up
+    if user_id in _user_refreshes:
+        # Re-read once the running refresh finishes, it may predate this write
+        _stale_user_refreshes.add(user_id)
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_refresh_user_until_current(user_id))
+    _user_refreshes[user_id] = task
+    task.add_done_callback(lambda _: _user_refreshes.pop(user_id, None))
+
+invalidation_bus.subscribe("user", schedule_user_index_refresh)
+
+def load_project_index():
+    """Build the faceted project index from one scan of the projects collection"""
+    projects = [(doc.id, doc.to_dict()) for doc in projects_repo.collection.stream()]
+    project_index.build(projects)
+    logger.info(f"Project index built for {len(projects)} projects")
+
+async def refresh_project(project_id: str):
+    """Re-read one project into the index after a write on any worker"""
+    try:
+        doc = await projects_repo.get(project_id)
+    except Exception as e:
+        logger.error(f"Failed to refresh project {project_id} in index: {e}")
+        return
+    if doc.exists:
+        project_index.upsert(project_id, doc.to_dict())
+    else:
+        project_index.remove(project_id)
+
+_project_refreshes = set()
+
+def schedule_project_refresh(project_id: str):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(refresh_project(project_id))
+    _project_refreshes.add(task)
+    task.add_done_callback(_project_refreshes.discard)
+
+def invalidate_project(project_id: str, project_data: Optional[dict] = None):
+    """Apply a project write to the local index and have every worker re-read it"""
+    if project_data is None:
+        project_index.remove(project_id)
+    else:
+        project_index.upsert(project_id, project_data)
+    invalidation_bus.publish("project", project_id)
+
+invalidation_bus.subscribe("project", schedule_project_refresh)
+
+@app.on_event("startup")
+async def warm_indexes():
+    try:
+        await run_blocking(load_user_indexes)
+    except Exception as e:
+        # Readers will retry the build lazily
+        logger.error(f"Failed to build user indexes on startup: {e}", exc_info=True)
+    try:
+        await run_blocking(load_project_index)
+    except Exception as e:
+        logger.error(f"Failed to build project index on startup: {e}", exc_info=True)
+
 # Request/Response Logging Middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -162,24 +308,144 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         }
     )
 
-# Socket.IO
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+# Socket.IO (message-queue-backed client manager when SOCKETIO_MESSAGE_QUEUE / REDIS_URL is set)
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', client_manager=create_client_manager())
 socket_app = socketio.ASGIApp(sio, app)
 
+# Multi-room emits: one encode, one delivery per socket (see core/notifier.py)
+notifier = Notifier(sio)
+
+# Online users and room membership across all workers
+presence = create_presence_tracker()
+
+@app.on_event("startup")
+async def start_presence():
+    await presence.start()
+
+@app.on_event("shutdown")
+async def stop_presence():
+    await presence.stop()
+
+# Write-behind persistence for chat messages sent over Socket.IO
+async def ack_message(ack, message_id, error):
+    """Tell the sender whether its message is durably stored"""
+    if not ack:
+        return
+    await sio.emit("message_ack", {
+        "clientId": ack.get("clientId"),
+        "id": message_id,
+        "status": "failed" if error else "saved"
+    }, to=ack["sid"])
+
+message_writer = MessageWriter(
+    on_commit=ack_message,
+    max_pending=int(os.getenv("MESSAGE_QUEUE_MAX_PENDING", "10000")),
+)
+
+@app.on_event("startup")
+async def start_message_writer():
+    message_writer.start()
+
+@app.on_event("shutdown")
+async def flush_message_writer():
+    await message_writer.stop()
+
+# Session reminders, fired SESSION_REMINDER_LEAD_HOURS before each scheduled session (see core/reminders.py)
+async def send_session_reminder(session_id: str, session_data: dict):
+    teacher_id = session_data.get("teacherId")
+    learner_id = session_data.get("learnerId")
+    users = await user_cards.get_many([teacher_id, learner_id])
+    scheduled_at = session_data.get("scheduledAt")
+    for uid, partner_id in ((teacher_id, learner_id), (learner_id, teacher_id)):
+        user_data = users.get(uid, {})
+        partner_name = users.get(partner_id, {}).get("name", "your partner")
+        await sio.emit("session_reminder", {
+            "sessionId": session_id,
+            "topic": session_data.get("topic"),
+            "scheduledAt": scheduled_at.isoformat() if isinstance(scheduled_at, datetime) else scheduled_at,
+            "partnerName": partner_name,
+            "meetLink": session_data.get("meetLink")
+        }, room=uid)
+        if email_service and user_data.get("email"):
+            email_service.send_session_reminder(session_data, user_data["email"], user_data.get("name"), partner_name)
+    logger.info(f"Session reminder sent for {session_id}")
+
+session_reminders = ReminderScheduler(
+    send_session_reminder,
+    lead=timedelta(hours=float(os.getenv("SESSION_REMINDER_LEAD_HOURS", "24"))),
+)
+
+@app.on_event("startup")
+async def start_session_reminders():
+    await session_reminders.start()
+
+@app.on_event("shutdown")
+async def stop_session_reminders():
+    await session_reminders.stop()
+
+# Outgoing email is queued and delivered by background workers (see core/email_outbox.py)
+email_outbox = None
+if email_service:
+    try:
+        email_outbox = EmailOutbox(
+            create_transport_from_env(),
+            store=Repository("emailOutbox"),
+            workers=int(os.getenv("EMAIL_OUTBOX_WORKERS", "4")),
+            max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "5")),
+        )
+        email_service.attach_outbox(email_outbox)
+    except Exception as e:
+        logger.error(f"Email outbox unavailable, sending synchronously: {e}")
+
+@app.on_event("startup")
+async def start_email_outbox():
+    if email_outbox:
+        await email_outbox.start()
+
+@app.on_event("shutdown")
+async def drain_email_outbox():
+    if email_outbox:
+        await email_outbox.stop()
+
 # Socket.IO Events
+SOCKETIO_REQUIRE_AUTH = os.getenv("SOCKETIO_REQUIRE_AUTH", "false").lower() == "true"
+
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
+    try:
+        uid = await authenticate_socket(environ, auth)
+    except ValueError:
+        if SOCKETIO_REQUIRE_AUTH:
+            raise socketio.exceptions.ConnectionRefusedError("authentication failed")
+        # Stale tokens on reconnect are common; connect them anonymously
+        logger.info(f"Socket {sid} sent an invalid token, connecting anonymously")
+        uid = None
+    if uid is None and SOCKETIO_REQUIRE_AUTH:
+        raise socketio.exceptions.ConnectionRefusedError("authentication required")
+    await sio.save_session(sid, {"uid": uid, "rooms": set()})
+    if uid:
+        await presence.user_connected(uid)
     print(f"Client connected: {sid}")
 
 @sio.event
 async def disconnect(sid):
+    session = await sio.get_session(sid)
+    if session.get("uid"):
+        await presence.user_disconnected(session["uid"])
+    for room in session.get("rooms", ()):
+        await presence.room_left(room)
     print(f"Client disconnected: {sid}")
 
 @sio.event
 async def join_room(sid, data):
     room = data.get("room")
     if room:
-        sio.enter_room(sid, room)
+        await sio.enter_room(sid, room)
+        async with sio.session(sid) as session:
+            joined = room not in session.setdefault("rooms", set())
+            session["rooms"].add(room)
+        if joined:
+            await presence.room_joined(room)
         print(f"Client {sid} joined room {room}")
 
 @sio.event
@@ -192,8 +458,11 @@ async def send_message(sid, data):
     
     if not all([sender_id, receiver_id, content]):
         return
+    if not all(isinstance(v, str) for v in (sender_id, receiver_id, content)) or not isinstance(room, (str, type(None))):
+        logger.warning(f"Rejecting malformed message payload from {sid}")
+        return
 
-    # Save to Firestore
+    # Queue for batched write to Firestore; "message_ack" follows once committed
     message_data = {
         "senderId": sender_id,
         "receiverId": receiver_id,
@@ -202,13 +471,16 @@ async def send_message(sid, data):
         "read": False,
         "room": room or f"{min(sender_id, receiver_id)}_{max(sender_id, receiver_id)}"
     }
-    db.collection("messages").add(message_data)
+    try:
+        message_writer.submit(message_data, [sender_id, receiver_id], ack={"sid": sid, "clientId": data.get("clientId")})
+    except MessageQueueFull:
+        logger.warning(f"Message queue full, rejecting message from {sender_id}")
+        await sio.emit("message_ack", {"clientId": data.get("clientId"), "id": None, "status": "rejected"}, to=sid)
+        return
     
     print(f"Message from {sender_id}: {content}")
-    # Broadcast to chat room
-    await sio.emit("receive_message", data, room=room, skip_sid=sid)
-    # Broadcast to receiver's personal room for notifications
-    await sio.emit("receive_message", data, room=receiver_id, skip_sid=sid)
+    # Broadcast to the chat room and the receiver's personal room, once per socket
+    await notifier.emit("receive_message", data, [room, receiver_id], skip_sid=sid)
 
 @app.get("/messages/contacts")
 async def get_message_contacts(current_user_id: str = Depends(get_current_user)):
@@ -216,81 +488,43 @@ async def get_message_contacts(current_user_id: str = Depends(get_current_user))
     try:
         logger.info(f"Fetching message contacts for user: {current_user_id}")
         
-        # Fetch sent and received messages
+        # Single indexed query over the per-room conversation summaries
         try:
-            sent_messages = list(db.collection("messages").where("senderId", "==", current_user_id).stream())
-            received_messages = list(db.collection("messages").where("receiverId", "==", current_user_id).stream())
+            conversations = await fetch_conversations(current_user_id)
         except GoogleCloudError as e:
-            logger.error(f"Firestore error fetching messages for {current_user_id}: {e}", exc_info=True)
+            logger.error(f"Firestore error fetching conversations for {current_user_id}: {e}", exc_info=True)
             raise HTTPException(
                 status_code=503,
                 detail="Database temporarily unavailable. Please try again later."
             )
         
-        # Extract unique contact IDs and track last messages
-        contact_ids = set()
+        # Extract unique contact IDs and their last messages (already most recent first)
+        contact_ids = []
         last_message_map = {}
+        unread_map = {}
         
-        for msg in sent_messages:
-            msg_data = msg.to_dict()
-            receiver_id = msg_data.get("receiverId")
-            if receiver_id and receiver_id != current_user_id:
-                contact_ids.add(receiver_id)
-                # Track last message timestamp
-                timestamp = msg_data.get("timestamp")
-                if receiver_id not in last_message_map or timestamp > last_message_map[receiver_id]["timestamp"]:
-                    last_message_map[receiver_id] = {
-                        "content": msg_data.get("content", ""),
-                        "timestamp": timestamp,
-                        "senderId": msg_data.get("senderId")
-                    }
-        
-        for msg in received_messages:
-            msg_data = msg.to_dict()
-            sender_id = msg_data.get("senderId")
-            if sender_id and sender_id != current_user_id:
-                contact_ids.add(sender_id)
-                # Track last message timestamp
-                timestamp = msg_data.get("timestamp")
-                if sender_id not in last_message_map or timestamp > last_message_map[sender_id]["timestamp"]:
-                    last_message_map[sender_id] = {
-                        "content": msg_data.get("content", ""),
-                        "timestamp": timestamp,
-                        "senderId": msg_data.get("senderId")
-                    }
-        
+        for conv in conversations:
+            conv_data = conv.to_dict()
+            for contact_id in conv_data.get("participants", []):
+                if contact_id != current_user_id and contact_id not in last_message_map:
+                    contact_ids.append(contact_id)
+                    last_message_map[contact_id] = conv_data.get("lastMessage") or {}
+                    unread_map[contact_id] = (conv_data.get("unread") or {}).get(current_user_id, 0)
         
-        # OPTIMIZATION: Use cache for user profiles (Phase 3)
-        # Try cache first, then batch fetch missing users
-        contact_data_map = {}
-        missing_contact_ids = []
-        
-        for contact_id in contact_ids:
-            cached_user = get_cached_user(contact_id)
-            if cached_user:
-                contact_data_map[contact_id] = cached_user
-            else:
-                missing_contact_ids.append(contact_id)
+        # Name/avatar cards from the card cache, one projected batch read for misses
+        try:
+            contact_data_map = await user_cards.get_many(contact_ids)
+        except GoogleCloudError as e:
+            logger.error(f"Firestore error fetching contact profiles: {e}", exc_info=True)
+            # Continue with partial data
+            contact_data_map = {}
         
-        # Batch fetch any users not in cache
-        if missing_contact_ids:
-            try:
-                contact_refs = [db.collection("users").document(cid) for cid in missing_contact_ids]
-                contact_docs = db.get_all(contact_refs)
-                for doc in contact_docs:
-                    if doc.exists:
-                        user_data = doc.to_dict()
-                        contact_data_map[doc.id] = user_data
-                        # Add to cache for future requests
-                        user_profile_cache[doc.id] = (user_data, datetime.now())
-            except GoogleCloudError as e:
-                logger.error(f"Firestore error fetching contact profiles: {e}", exc_info=True)
-                # Continue with partial data
+        online_map = await presence.online(contact_ids)
         
         # Build contacts list
         contacts = []
         for contact_id in contact_ids:
-            user_data = contact_data_map.get(contact_id, {})
+            user_data = contact_data_map.get(contact_id)
             if user_data:  # Only include if user data exists
                 last_msg = last_message_map.get(contact_id, {})
                 contacts.append({
@@ -299,12 +533,10 @@ async def get_message_contacts(current_user_id: str = Depends(get_current_user))
                     "avatar": user_data.get("avatar"),
                     "lastMessage": last_msg.get("content", ""),
                     "lastMessageTime": last_msg.get("timestamp").isoformat() if last_msg.get("timestamp") else None,
-                    "isOnline": False  # Can be enhanced with presence tracking
+                    "unreadCount": unread_map.get(contact_id, 0),
+                    "isOnline": online_map.get(contact_id, False)
                 })
         
-        # Sort by last message time (most recent first)
-        contacts.sort(key=lambda x: x.get("lastMessageTime") or "", reverse=True)
-        
         logger.info(f"Successfully fetched {len(contacts)} contacts for user {current_user_id}")
         return contacts
         
@@ -318,15 +550,72 @@ async def get_message_contacts(current_user_id: str = Depends(get_current_user))
         )
 
 @app.get("/messages/history/{other_user_id}")
-async def get_message_history(other_user_id: str, current_user_id: str = Depends(get_current_user)):
-    """Get message history between current user and another user"""
+async def get_message_history(
+    other_user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    current_user_id: str = Depends(get_current_user)
+):
+    """
+    Get a page of message history between current user and another user (oldest first).
+    
+    Returns the latest `limit` messages by default. Pass the X-Before-Cursor response
+    header as `before` to scroll back, or X-After-Cursor as `after` to fetch newer
+    messages. Cursors are on (timestamp, id), backed by the (room, timestamp) index.
+    
+    With `Accept: application/x-ndjson` the whole history from the cursor on is
+    streamed, one message per line: oldest first, or newest first with `before`.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+    
     room = "_".join(sorted([current_user_id, other_user_id]))
+    page_size = clamp_page_size(limit)
     
-    # Fetch all messages in this room
-    messages_ref = db.collection("messages").where("room", "==", room).order_by("timestamp").stream()
+    try:
+        cursor = decode_cursor(before or after) if (before or after) else None
+        if cursor is not None and not (
+            len(cursor) == 2 and isinstance(cursor[0], datetime) and isinstance(cursor[1], str)
+        ):
+            raise ValueError("Invalid cursor")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    query = messages_repo.where("room", "==", room)
+    if after:
+        query = query.order_by("timestamp").order_by("__name__")
+    else:
+        query = query.order_by("timestamp", direction="DESCENDING").order_by("__name__", direction="DESCENDING")
+    if cursor:
+        query = query.start_after(cursor)
+    
+    if wants_ndjson(request):
+        if not before:
+            query = messages_repo.where("room", "==", room).order_by("timestamp").order_by("__name__")
+            if cursor:
+                query = query.start_after(cursor)
+            else:
+                await mark_read(room, current_user_id)
+        return ndjson_response(messages_repo.stream(query), lambda doc: {**doc.to_dict(), "id": doc.id})
+    
+    if cursor:
+        docs = await messages_repo.fetch(query.limit(page_size + 1))
+    else:
+        # Opening the latest page of a chat marks it as read
+        docs, _ = await asyncio.gather(
+            messages_repo.fetch(query.limit(page_size + 1)),
+            mark_read(room, current_user_id),
+        )
+    has_more = len(docs) > page_size
+    docs = docs[:page_size]
+    if not after:
+        docs.reverse()
     
     messages = []
-    for msg_doc in messages_ref:
+    for msg_doc in docs:
         msg_data = msg_doc.to_dict()
         msg_data["id"] = msg_doc.id
         # Convert timestamp to ISO string for JSON serialization
@@ -334,6 +623,14 @@ async def get_message_history(other_user_id: str, current_user_id: str = Depends
             msg_data["timestamp"] = msg_data["timestamp"].isoformat()
         messages.append(msg_data)
     
+    if docs:
+        oldest, newest = docs[0], docs[-1]
+        # Older messages exist if this page was cut short, or if we paged forward from a cursor
+        if after or has_more:
+            response.headers["X-Before-Cursor"] = encode_cursor(oldest.get("timestamp"), oldest.id)
+        response.headers["X-After-Cursor"] = encode_cursor(newest.get("timestamp"), newest.id)
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    
     return messages
 
 @app.get("/")
@@ -345,12 +642,38 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/health/stats")
+async def health_stats():
+    """In-process cache and index statistics for this worker"""
+    return {
+        "caches": {
+            user_profile_cache.name: user_profile_cache.stats(),
+            session_cache.name: session_cache.stats(),
+            user_cards.cache.name: user_cards.stats(),
+        },
+        "invalidation": invalidation_bus.stats(),
+        "auth": token_verifier.stats(),
+        "messageWriter": message_writer.stats(),
+        "presence": presence.stats(),
+        "notifications": notifier.stats(),
+        "email": email_outbox.stats() if email_outbox else None,
+        "reminders": session_reminders.stats(),
+        "xpLedger": xp_ledger.stats(),
+        "indexes": {
+            "skillIndexUsers": len(skill_index),
+            "leaderboardUsers": len(leaderboard),
+            "projects": len(project_index),
+        },
+    }
+
 @app.post("/users/", response_model=skillshare_data_models.User)
 async def create_user(user: skillshare_data_models.User, current_user_id: str = Depends(get_current_user)):
     # Force the user ID to match the authenticated token
     user.id = current_user_id
-    doc_ref = db.collection("users").document(current_user_id)
-    doc_ref.set(user.dict())
+    await users_repo.set(current_user_id, user.dict())
+    invalidate_user_cache(current_user_id)
+    skill_index.upsert(current_user_id, user.skills, user.learning)
+    leaderboard.upsert(current_user_id, user.dict())
     
     # Send welcome email
     try:
@@ -368,10 +691,9 @@ async def read_current_user(current_user_id: str = Depends(get_current_user)):
     try:
         logger.info(f"Fetching user data for user: {current_user_id}")
         
-        # 1. Fetch user data first
+        # 1. Fetch user data first (served from the profile cache when warm)
         try:
-            doc_ref = db.collection("users").document(current_user_id)
-            doc = doc_ref.get()
+            cached_data = await get_cached_user(current_user_id)
         except GoogleCloudError as e:
             logger.error(f"Firestore error fetching user {current_user_id}: {e}", exc_info=True)
             raise HTTPException(
@@ -379,214 +701,34 @@ async def read_current_user(current_user_id: str = Depends(get_current_user)):
                 detail="Database temporarily unavailable. Please try again later."
             )
         
-        if not doc.exists:
+        if cached_data is None:
             logger.warning(f"User not found: {current_user_id}")
             raise HTTPException(status_code=404, detail="User profile not found")
             
-        user_data = doc.to_dict()
-        
-        # PHASE 4 OPTIMIZATION: Only recalculate if needed
-        # Check if we need to recalculate stats
-        last_calculated = user_data.get("lastCalculated")
-        recalculation_interval = 3600  # 1 hour in seconds
-        should_recalculate = True
-        
-        if last_calculated:
-            # Check if last calculation was recent
-            try:
-                if hasattr(last_calculated, "timestamp"):
-                    last_calc_time = datetime.fromtimestamp(last_calculated.timestamp())
-                elif isinstance(last_calculated, str):
-                    last_calc_time = datetime.fromisoformat(last_calculated)
-                else:
-                    last_calc_time = last_calculated
-                    
-                time_since_calc = (datetime.now() - last_calc_time).total_seconds()
-                should_recalculate = time_since_calc > recalculation_interval
-                
-                if not should_recalculate:
-                    logger.info(f"Using cached stats for user {current_user_id} (age: {time_since_calc:.0f}s)")
-            except Exception as e:
-                logger.warning(f"Error parsing lastCalculated timestamp: {e}")
-                should_recalculate = True
-        
-        # If stats are fresh, return cached values
-        if not should_recalculate:
-            user_data['id'] = current_user_id
-            return skillshare_data_models.User(**user_data)
-        
-        logger.info(f"Recalculating stats for user {current_user_id}")
+        user_data = dict(cached_data)
         
-        # RECALCULATION NEEDED - Fetch data in parallel
-        def fetch_sessions():
-            try:
-                sessions_ref = db.collection("sessions")
-                teacher_sessions = sessions_ref.where("teacherId", "==", current_user_id).where("status", "in", ["SCHEDULED", "COMPLETED"]).stream()
-                learner_sessions = sessions_ref.where("learnerId", "==", current_user_id).where("status", "in", ["SCHEDULED", "COMPLETED"]).stream()
-                
-                confirmed_sessions = list(teacher_sessions) + list(learner_sessions)
-                unique_session_ids = set()
-                valid_sessions = []
-                for s in confirmed_sessions:
-                    if s.id not in unique_session_ids:
-                        unique_session_ids.add(s.id)
-                        valid_sessions.append(s.to_dict())
-                return valid_sessions
-            except Exception as e:
-                logger.error(f"Error fetching sessions: {e}", exc_info=True)
-                return []
-        
-        def fetch_matches():
-            try:
-                matches_ref = db.collection("matches")
-                m1 = matches_ref.where("user1Id", "==", current_user_id).stream()
-                m2 = matches_ref.where("user2Id", "==", current_user_id).stream()
-                return list(m1) + list(m2)
-            except Exception as e:
-                logger.error(f"Error fetching matches: {e}", exc_info=True)
-                return []
-        
-        def fetch_projects():
-            try:
-                return list(db.collection("projects").stream())
-            except Exception as e:
-                logger.error(f"Error fetching projects: {e}", exc_info=True)
-                return []
-        
-        def fetch_messages():
-            try:
-                return list(db.collection("messages").where("senderId", "==", current_user_id).stream())
-            except Exception as e:
-                logger.error(f"Error fetching messages: {e}", exc_info=True)
-                return []
-        
-        # Execute all queries in parallel (3x faster!)
-        try:
-            loop = asyncio.get_event_loop()
-            valid_sessions, matches_docs, projects_docs, messages_docs = await asyncio.gather(
-                loop.run_in_executor(executor, fetch_sessions),
-                loop.run_in_executor(executor, fetch_matches),
-                loop.run_in_executor(executor, fetch_projects),
-                loop.run_in_executor(executor, fetch_messages)
-            )
-        except Exception as e:
-            logger.error(f"Error in parallel data fetching: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to fetch user data. Please try again."
-            )
-        
-        session_count = len(valid_sessions)
-        # Add bonusMinutes (requested as "timing of like five hours")
-        total_minutes = sum(s.get("duration", 0) for s in valid_sessions) + user_data.get("bonusMinutes", 0)
-        total_hours = round(total_minutes / 60, 1)
-
-        # Daily Goal Calculation
-        today = datetime.now().date()
-        daily_progress = 0
-        
-        # 1. Count Sessions scheduled for today
-        for s in valid_sessions:
-            if s.get('scheduledAt'):
-                try:
-                    s_date = s.get('scheduledAt')
-                    if hasattr(s_date, "date"): # Handles datetime/Timestamp
-                        s_date = s_date.date()
-                    elif isinstance(s_date, str):
-                        s_date = datetime.fromisoformat(s_date).date()
-                    if s_date == today:
-                        daily_progress += 1
-                except:
-                    pass
-
-        # 2. Count Mutual Matches made today
-        seen_match_ids = set()
-        for m in matches_docs:
-            if m.id not in seen_match_ids:
-                seen_match_ids.add(m.id)
-                m_data = m.to_dict()
-                m_created = m_data.get("createdAt")
-                try:
-                    if hasattr(m_created, "date"):
-                        m_created = m_created.date()
-                    elif isinstance(m_created, str):
-                        m_created = datetime.fromisoformat(m_created).date()
-                    
-                    if m_created == today:
-                        daily_progress += 1
-                except:
-                    pass
-        
-        bonus_xp = user_data.get("bonusXp", 0)
-        # XP Calculation: 100 per session + 2 per minute + bonus actions
-        xp = (session_count * 100) + (total_minutes * 2) + bonus_xp
-        
-        # Level Calculation: 1 + floor(xp / 500)
-        level = 1 + (xp // 500)
-
-        # Calculate Dynamic Trust Score
-        base_trust = 0.0
-        
-        # 1. Manual ratings (weighted average)
-        ratings = user_data.get("ratings", [])
-        if ratings:
-            avg_rating = sum(r.get("score", 0) for r in ratings) / len(ratings)
-            base_trust = avg_rating  # Ratings are 0-100
-        
-        # 2. Activity bonuses
-        activity_trust = 0.0
-        
-        # Completed sessions: +0.5 per session (max +10)
-        completed_sessions = [s for s in valid_sessions if s.get("status") == "COMPLETED"]
-        activity_trust += min(len(completed_sessions) * 0.5, 10)
-        
-        # Projects joined: +1 per project (max +5)
-        user_projects_count = 0
-        for p in projects_docs:
-            p_data = p.to_dict()
-            if current_user_id in p_data.get("memberIds", []):
-                user_projects_count += 1
-        activity_trust += min(user_projects_count * 1.0, 5)
-        
-        # Streak bonus: +0.2 per week of streak (max +5)
-        streak = user_data.get("streak", 0)
-        weeks_streak = streak // 7
-        activity_trust += min(weeks_streak * 0.2, 5)
-        
-        # Message activity: +0.1 per 10 messages (max +3)
-        message_count = len(messages_docs)
-        activity_trust += min((message_count // 10) * 0.1, 3)
-        
-        # Calculate final trust score (0-100 scale)
-        dynamic_trust_score = min(base_trust + activity_trust, 100.0)
-
-        # Emit notifications for XP/Level changes
-        old_xp = user_data.get("xp", 0)
-        if xp > old_xp:
-            await sio.emit("xp_update", {"amount": xp - old_xp, "reason": "Dynamic Progress"}, room=current_user_id)
-            
-        old_level = user_data.get("level", 1)
-        if level > old_level:
-            await sio.emit("level_up", {"level": level}, room=current_user_id)
-
-        # PHASE 4: Update only trust score and daily progress (NOT xp/sessions/totalHours/level)
-        # Those are now updated in real-time when sessions complete
+        # Stats come from counters kept on the user document by the write paths
         updates = {
-            "dailyGoalProgress": daily_progress,
-            "trustScore": dynamic_trust_score,
-            "lastCalculated": datetime.now()  # Track when we last calculated
+            "dailyGoalProgress": daily_goal_progress(user_data),
+            "trustScore": trust_score(user_data),
+            "level": level_for(user_data.get("xp", 0)),
         }
-        
-        try:
-            doc_ref.update(updates)
-            user_data.update(updates)
-            logger.info(f"Successfully updated stats for user {current_user_id}")
-        except GoogleCloudError as e:
-            logger.error(f"Error updating user stats: {e}", exc_info=True)
-            # Continue anyway with calculated values
-        
-        # Invalidate cache since we updated user data
-        invalidate_user_cache(current_user_id)
+        changed = {k: v for k, v in updates.items() if user_data.get(k) != v}
+        # Drop dailyCounts buckets for past days so the map stays at today and later
+        stale_days = user_stats.stale_daily_counts(user_data)
+        if changed or stale_days:
+            try:
+                write = {**changed, "dailyCounts": stale_days} if stale_days else changed
+                await users_repo.set(current_user_id, write, merge=True)
+                invalidate_user_cache(current_user_id)
+            except GoogleCloudError as e:
+                logger.error(f"Error updating user stats: {e}", exc_info=True)
+                # Continue anyway with calculated values
+            user_data.update(changed)
+            if stale_days:
+                user_data["dailyCounts"] = {
+                    day: kinds for day, kinds in user_data["dailyCounts"].items() if day not in stale_days
+                }
             
         user_data['id'] = current_user_id
         return skillshare_data_models.User(**user_data)
@@ -606,41 +748,19 @@ async def rate_user(user_id: str, score: float, current_user_id: str = Depends(g
     if user_id == current_user_id:
         raise HTTPException(status_code=400, detail="You cannot rate yourself")
     
-    # 1. Verify user exists
-    target_ref = db.collection("users").document(user_id)
-    target_doc = target_ref.get()
-    if not target_doc.exists:
+    # Per-rater document plus running sum/count, updated in one transaction
+    try:
+        avg_score = await ratings.rate_user(user_id, current_user_id, score)
+    except ratings.UserNotFound:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    target_data = target_doc.to_dict()
-    ratings = target_data.get("ratings", [])
-    
-    # 2. Update or add rating
-    found = False
-    for r in ratings:
-        if r.get("raterId") == current_user_id:
-            r["score"] = score
-            found = True
-            break
-    
-    if not found:
-        ratings.append({"raterId": current_user_id, "score": score})
-    
-    # 3. Calculate new average trust score
-    avg_score = sum(r.get("score", 0) for r in ratings) / len(ratings)
-    
-    target_ref.update({
-        "ratings": ratings,
-        "trustScore": round(avg_score, 1)
-    })
+    invalidate_user_cache(user_id)
     
     return {"message": "Rating submitted successfully", "trustScore": avg_score}
 
 @app.post("/users/check-in")
 async def daily_check_in(current_user_id: str = Depends(get_current_user)):
     """Award XP for daily login and update streak."""
-    doc_ref = db.collection("users").document(current_user_id)
-    doc = doc_ref.get()
+    doc = await users_repo.get(current_user_id)
     if not doc.exists:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -659,21 +779,26 @@ async def daily_check_in(current_user_id: str = Depends(get_current_user)):
             return {"message": "Already checked in today", "bonusXp": 0}
         
         # Update streak
-        if last_date == today - timedelta(days=1):
-            streak = user_data.get("streak", 0) + 1
-        else:
-            streak = 1
+        continues_streak = last_date == today - timedelta(days=1)
     else:
-        streak = 1
-        
-    bonus_xp = user_data.get("bonusXp", 0) + 10
-    
-    updates = {
-        "bonusXp": bonus_xp,
-        "streak": streak,
-        "lastCheckIn": now
-    }
-    doc_ref.update(updates)
+        continues_streak = False
+    streak = user_data.get("streak", 0) + 1 if continues_streak else 1
+        
+    # One check-in award per day: a concurrent duplicate fails on the ledger entry.
+    # A continued streak is an increment so it cannot overwrite a concurrent match bonus.
+    awarded = await xp_ledger.apply([Award(
+        current_user_id, "daily_check_in",
+        {"bonusXp": 10, "streak": 1 if continues_streak else 0},
+        source_id=today.isoformat(),
+        fields={"lastCheckIn": now} if continues_streak else {"streak": 1, "lastCheckIn": now}
+    )])
+    if not awarded:
+        return {"message": "Already checked in today", "bonusXp": 0}
+    invalidate_user_cache(current_user_id)
+    if continues_streak:
+        leaderboard.increment(current_user_id, {"streak": 1})
+    else:
+        leaderboard.upsert(current_user_id, {"streak": 1})
     return {"message": "Daily check-in successful!", "bonusXp": 10, "streak": streak}
 
 @app.put("/users/me", response_model=skillshare_data_models.User)
@@ -683,44 +808,111 @@ async def update_current_user(updates: dict, current_user_id: str = Depends(get_
     Allows updating: name, headline, age, country, location, languages, 
     experienceLevel, availability, about, skills, learning, badges, blueprints, avatar
     """
-    doc_ref = db.collection("users").document(current_user_id)
-    doc = doc_ref.get()
+    doc = await users_repo.get(current_user_id)
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="skillshare_data_models.User profile not found")
     
     # Filter out fields that shouldn't be updated directly (calculated fields)
-    protected_fields = {'id', 'xp', 'level', 'sessions', 'totalHours', 'dailyGoalProgress', 'trustScore'}
+    protected_fields = {'id', 'xp', 'level', 'sessions', 'totalHours', 'dailyGoalProgress', 'trustScore',
+                        'messageCount', 'completedSessions', 'projectCount', 'dailyCounts',
+                        'ratings', 'ratingSum', 'ratingCount'}
     safe_updates = {k: v for k, v in updates.items() if k not in protected_fields}
     
     if safe_updates:
-        doc_ref.update(safe_updates)
+        await users_repo.update(current_user_id, safe_updates)
+        invalidate_user_cache(current_user_id)
     
     # Fetch and return updated user
-    updated_doc = doc_ref.get()
-    return skillshare_data_models.User(**updated_doc.to_dict())
+    updated_doc = await users_repo.get(current_user_id)
+    updated_data = updated_doc.to_dict()
+    if "skills" in safe_updates or "learning" in safe_updates:
+        skill_index.upsert(current_user_id, updated_data.get("skills", []), updated_data.get("learning", []))
+    leaderboard.upsert(current_user_id, safe_updates)
+    return skillshare_data_models.User(**updated_data)
 
 @app.get("/users/{user_id}", response_model=skillshare_data_models.User)
 async def read_user(user_id: str, current_user_id: str = Depends(get_current_user)):
-    doc_ref = db.collection("users").document(user_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        return skillshare_data_models.User(**doc.to_dict())
+    user_data = await get_cached_user(user_id)
+    if user_data is not None:
+        return skillshare_data_models.User(**user_data)
     raise HTTPException(status_code=404, detail="skillshare_data_models.User not found")
 
+# Profile fields a /users/ listing may ask for; the document ID is always returned
+USER_FIELDS = [name for name in field_names(skillshare_data_models.User) if name != "id"]
+
 @app.get("/users/", response_model=List[skillshare_data_models.User])
-async def read_users(skip: int = 0, limit: int = 100, current_user_id: str = Depends(get_current_user)):
-    users_ref = db.collection("users")
-    docs = users_ref.limit(limit).stream()
-    return [skillshare_data_models.User(**doc.to_dict()) for doc in docs]
+async def read_users(
+    request: Request,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user_id: str = Depends(get_current_user)
+):
+    """
+    A page of users in document ID order.
+    
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    `fields` is a comma-separated sparse fieldset (e.g. fields=name,avatar,skills):
+    only those fields are read from Firestore and returned, alongside `id`.
+    With `Accept: application/x-ndjson` every user from the cursor on is streamed.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None and not (len(after) == 1 and isinstance(after[0], str)):
+            raise ValueError("Invalid cursor")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if selected is not None:
+        unknown = sorted(set(selected) - set(USER_FIELDS) - {"id"})
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        selected = [f for f in dict.fromkeys(selected) if f != "id"]
+    
+    # Only the requested columns (or the profile fields, never internal counters) leave Firestore.
+    # An empty projection means "all fields", so fields=id projects onto the document name alone
+    if selected is None:
+        projection = USER_FIELDS
+    else:
+        projection = selected or ["__name__"]
+    query = users_repo.collection.select(projection).order_by("__name__")
+    if after:
+        query = query.start_after(after)
+    
+    if selected is not None:
+        def to_record(doc):
+            data = doc.to_dict()
+            return {"id": doc.id, **{f: data.get(f) for f in selected}}
+    else:
+        def to_record(doc):
+            return trusted(skillshare_data_models.User, {**doc.to_dict(), "id": doc.id})
+    
+    if wants_ndjson(request):
+        return ndjson_response(users_repo.stream(query), to_record)
+    
+    page_size = clamp_page_size(limit, default=100)
+    docs = await users_repo.fetch(query.limit(page_size + 1))
+    headers = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        headers = {"X-Next-Cursor": encode_cursor(docs[-1].id)}
+    return FastJSONResponse([to_record(doc) for doc in docs], headers=headers)
 
 @app.post("/sessions/", response_model=skillshare_data_models.Session)
 async def create_session(session: skillshare_data_models.Session, current_user_id: str = Depends(get_current_user)):
     try:
         print(f"[DEBUG] Entering create_session for user {current_user_id}")
-        doc_ref = db.collection("sessions").document()
+        doc_ref = sessions_repo.document()
         session.id = doc_ref.id
-        doc_ref.set(session.dict())
+        await sessions_repo.set(session.id, session.dict())
+        session_reminders.schedule(session.id, session.dict())
+        daily_changes = user_stats.session_daily_changes(None, session.dict())
+        if daily_changes:
+            await user_stats.increment([session.teacherId, session.learnerId], daily=daily_changes)
+            invalidate_user_cache(session.teacherId)
+            invalidate_user_cache(session.learnerId)
         print(f"[DEBUG] Session created with ID: {session.id}")
     
         # Send automated chat message
@@ -730,8 +922,8 @@ async def create_session(session: skillshare_data_models.Session, current_user_i
         schedule_time = session.scheduledAt.strftime("%Y-%m-%d %H:%M")
         
         # Get caller name
-        current_user_doc = db.collection("users").document(current_user_id).get()
-        caller_name = current_user_doc.to_dict().get("name", "Someone") if current_user_doc.exists else "Someone"
+        caller = await user_cards.get(current_user_id)
+        caller_name = caller.get("name", "Someone") if caller else "Someone"
 
         content = f"🗓️ Session Request!\n**{caller_name}** sent a request.\n**Topic:** {session.topic}\n**Time:** {schedule_time}\n**Duration:** {session.duration} min\n[SESSION_ID:{session.id}]"
         if session.meetLink:
@@ -749,23 +941,11 @@ async def create_session(session: skillshare_data_models.Session, current_user_i
             "isRequest": True, # Extra metadata
             "sessionId": session.id
         }
-        db.collection("messages").add(message_data)
+        await record_message(message_data, [current_user_id, other_user_id])
         print(f"[DEBUG] Automated message saved to Firestore for room {room}")
         
-        # Real-time emission to chat room
-        await sio.emit("receive_message", {
-            "senderId": current_user_id,
-            "receiverId": other_user_id,
-            "content": content,
-            "room": room,
-            "timestamp": message_data["timestamp"].isoformat(),
-            "isRequest": True,
-            "sessionId": session.id
-        }, room=room)
-        print(f"[DEBUG] Emitted to room {room}")
-        
-        # Real-time emission to receiver's personal room
-        await sio.emit("receive_message", {
+        # Real-time emission to chat room and receiver's personal room
+        await notifier.emit("receive_message", {
             "senderId": current_user_id,
             "receiverId": other_user_id,
             "content": content,
@@ -773,8 +953,8 @@ async def create_session(session: skillshare_data_models.Session, current_user_i
             "timestamp": message_data["timestamp"].isoformat(),
             "isRequest": True,
             "sessionId": session.id
-        }, room=other_user_id)
-        print(f"[DEBUG] Emitted to personal room {other_user_id}")
+        }, [room, other_user_id])
+        print(f"[DEBUG] Emitted to room {room} and personal room {other_user_id}")
         
         return session
 
@@ -789,14 +969,14 @@ async def create_session(session: skillshare_data_models.Session, current_user_i
 @app.get("/sessions/", response_model=List[skillshare_data_models.Session])
 async def read_sessions(current_user_id: str = Depends(get_current_user)):
     # Fetch sessions where user is teacher or learner
-    sessions_ref = db.collection("sessions")
-    
     # Firestore limitation: cannot do OR query on different fields easily without complex setup.
-    # We fetch both and merge them.
-    teacher_docs = sessions_ref.where("teacherId", "==", current_user_id).stream()
-    learner_docs = sessions_ref.where("learnerId", "==", current_user_id).stream()
+    # We fetch both (concurrently) and merge them.
+    teacher_docs, learner_docs = await asyncio.gather(
+        sessions_repo.fetch(sessions_repo.where("teacherId", "==", current_user_id)),
+        sessions_repo.fetch(sessions_repo.where("learnerId", "==", current_user_id)),
+    )
     
-    raw_sessions = list(teacher_docs) + list(learner_docs)
+    raw_sessions = teacher_docs + learner_docs
     unique_sessions = []
     seen_ids = set()
     partner_ids = set()
@@ -815,16 +995,11 @@ async def read_sessions(current_user_id: str = Depends(get_current_user)):
     # Batch fetch partner user profiles
     user_names = {}
     if partner_ids:
-        users_ref = db.collection("users")
-        partner_refs = [users_ref.document(pid) for pid in partner_ids]
-        partner_docs = db.get_all(partner_refs)
-        for u_doc in partner_docs:
-            if u_doc.exists:
-                u_data = u_doc.to_dict()
-                user_names[u_doc.id] = {
-                    "name": u_data.get("name", "Unknown"),
-                    "avatar": u_data.get("avatar")
-                }
+        for uid, card in (await user_cards.get_many(partner_ids)).items():
+            user_names[uid] = {
+                "name": card.get("name", "Unknown"),
+                "avatar": card.avatar
+            }
 
     # Finalize session data
     all_sessions = []
@@ -836,13 +1011,12 @@ async def read_sessions(current_user_id: str = Depends(get_current_user)):
         s['role'] = "Teacher" if current_user_id == s.get('teacherId') else "Learner"
         all_sessions.append(s)
             
-    return all_sessions
+    return trusted_response(skillshare_data_models.Session, all_sessions)
 
 @app.put("/sessions/{session_id}", response_model=skillshare_data_models.Session)
 async def update_session(session_id: str, updates: dict, current_user_id: str = Depends(get_current_user)):
     """Update an existing session (e.g., set meetLink, change status)."""
-    doc_ref = db.collection("sessions").document(session_id)
-    doc = doc_ref.get()
+    doc = await sessions_repo.get(session_id)
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -852,47 +1026,59 @@ async def update_session(session_id: str, updates: dict, current_user_id: str =
     if session_data.get("teacherId") != current_user_id and session_data.get("learnerId") != current_user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this session")
         
-    doc_ref.update(updates)
+    await sessions_repo.update(session_id, updates)
+    invalidate_session_cache(session_data.get("teacherId"))
+    invalidate_session_cache(session_data.get("learnerId"))
+    session_reminders.schedule(session_id, {**session_data, **updates})
+    
+    # Keep the participants' daily goal counters in step with the session
+    daily_changes = user_stats.session_daily_changes(session_data, {**session_data, **updates})
+    if daily_changes:
+        await user_stats.increment(
+            [session_data.get("teacherId"), session_data.get("learnerId")],
+            daily=daily_changes,
+        )
+        invalidate_user_cache(session_data.get("teacherId"))
+        invalidate_user_cache(session_data.get("learnerId"))
     
-    # If session is completed, award XP to both users
+    # If session is completed, award XP to both users (once per session, via the ledger)
     if updates.get("status") == skillshare_data_models.SessionStatus.COMPLETED.value:
-        teacher_id = session_data.get("teacherId")
-        learner_id = session_data.get("learnerId")
+        # Awards go only to participants with a user document; one unknown ID would fail both
+        participants = [
+            uid for uid in (session_data.get("teacherId"), session_data.get("learnerId"))
+            if uid in await user_stats.known_users([uid])
+        ]
         duration = session_data.get("duration", 0)
         
-        # Award XP and update stats for teacher and learner
-        for uid in [teacher_id, learner_id]:
-            u_ref = db.collection("users").document(uid)
-            u_snap = u_ref.get()
-            if u_snap.exists:
-                u_doc = u_snap.to_dict()
-                
-                # Calculate XP gain (50 base + duration bonus)
-                xp_gain = 50 + (duration // 30) * 10  # 10 XP per 30 min
+        # Calculate XP gain (50 base + duration bonus)
+        xp_gain = 50 + (duration // 30) * 10  # 10 XP per 30 min
+        awarded = await xp_ledger.apply(awards_for(participants, "session_completed", {
+            "xp": xp_gain,
+            "sessions": 1,
+            "completedSessions": 1,
+            "totalHours": duration / 60.0,
+            "bonusXp": xp_gain
+        }, source_id=session_id))
+        
+        if awarded:
+            # level follows the committed xp, so raises from other workers' awards are not missed
+            raised = await xp_ledger.settle_levels(participants)
+            for uid in filter(None, participants):
+                invalidate_user_cache(uid)
+                leaderboard.increment(uid, {"xp": xp_gain, "sessions": 1})
                 
-                # Update all user stats
-                new_xp = u_doc.get("xp", 0) + xp_gain
-                new_sessions = u_doc.get("sessions", 0) + 1
-                new_total_hours = u_doc.get("totalHours", 0.0) + (duration / 60.0)
-                
-                # Calculate new level (every 100 XP = 1 level)
-                new_level = (new_xp // 100) + 1
-                
-                u_ref.update({
-                    "xp": new_xp,
-                    "sessions": new_sessions,
-                    "totalHours": new_total_hours,
-                    "level": new_level,
-                    "bonusXp": u_doc.get("bonusXp", 0) + xp_gain
-                })
+                # Notify on the write path rather than when /users/me is next read
+                await sio.emit("xp_update", {"amount": xp_gain, "reason": "Session completed"}, room=uid)
+                if uid in raised:
+                    await sio.emit("level_up", {"level": raised[uid]}, room=uid)
 
     # If status becomes SCHEDULED (Accepted from PENDING)
     if updates.get("status") == "SCHEDULED" and session_data.get("status") == "PENDING":
         other_user_id = session_data.get("teacherId") if current_user_id == session_data.get("learnerId") else session_data.get("learnerId")
         
         # Get caller name
-        current_user_doc = db.collection("users").document(current_user_id).get()
-        caller_name = current_user_doc.to_dict().get("name", "User") if current_user_doc.exists else "User"
+        caller = await user_cards.get(current_user_id)
+        caller_name = caller.get("name", "User") if caller else "User"
         
         content = f"✅ Session Confirmed!\n**{caller_name}** accepted your request for **{session_data.get('topic')}**."
         room = "_".join(sorted([current_user_id, other_user_id]))
@@ -905,36 +1091,26 @@ async def update_session(session_id: str, updates: dict, current_user_id: str =
             "read": False,
             "room": room
         }
-        db.collection("messages").add(message_data)
+        await record_message(message_data, [current_user_id, other_user_id])
         
-        # Real-time emission to chat room
-        await sio.emit("receive_message", {
-            "senderId": current_user_id,
-            "receiverId": other_user_id,
-            "content": content,
-            "room": room,
-            "timestamp": message_data["timestamp"].isoformat()
-        }, room=room)
-
-        # Real-time emission to receiver's personal room
-        await sio.emit("receive_message", {
+        # Real-time emission to chat room and receiver's personal room
+        await notifier.emit("receive_message", {
             "senderId": current_user_id,
             "receiverId": other_user_id,
             "content": content,
             "room": room,
             "timestamp": message_data["timestamp"].isoformat()
-        }, room=other_user_id)
+        }, [room, other_user_id])
         
         # Send session confirmation emails
         if email_service:
             try:
                 # Get user emails
-                teacher_doc = db.collection("users").document(session_data.get("teacherId")).get()
-                learner_doc = db.collection("users").document(session_data.get("learnerId")).get()
+                cards = await user_cards.get_many([session_data.get("teacherId"), session_data.get("learnerId")])
+                teacher_data = cards.get(session_data.get("teacherId"))
+                learner_data = cards.get(session_data.get("learnerId"))
                 
-                if teacher_doc.exists and learner_doc.exists:
-                    teacher_data = teacher_doc.to_dict()
-                    learner_data = learner_doc.to_dict()
+                if teacher_data and learner_data:
                     
                     # Prepare session data for email
                     email_session_data = {
@@ -975,18 +1151,17 @@ async def update_session(session_id: str, updates: dict, current_user_id: str =
 
 @app.post("/tasks/", response_model=skillshare_data_models.Task)
 async def create_task(task: skillshare_data_models.Task, current_user_id: str = Depends(get_current_user)):
-    doc_ref = db.collection("tasks").document()
+    doc_ref = tasks_repo.document()
     task.id = doc_ref.id
     task.assignedById = current_user_id # Force current user as assigner
-    doc_ref.set(task.dict())
+    await tasks_repo.set(task.id, task.dict())
     return task
 
 @app.get("/tasks/", response_model=List[skillshare_data_models.Task])
 async def read_tasks(current_user_id: str = Depends(get_current_user)):
-    tasks_ref = db.collection("tasks")
     # Filter by assignedToId == current_user_id
-    docs = tasks_ref.where("assignedToId", "==", current_user_id).stream()
-    return [skillshare_data_models.Task(**doc.to_dict()) for doc in docs]
+    docs = await tasks_repo.fetch(tasks_repo.where("assignedToId", "==", current_user_id))
+    return trusted_response(skillshare_data_models.Task, (doc.to_dict() for doc in docs))
 def calculate_match_score(wants_to_learn: set, user_teaches: set, target_skills: set, target_learning: set) -> int:
     """Calculate match score (0-100) between two users."""
     # Intersection of (User Wants) AND (Target Teaches)
@@ -1011,8 +1186,7 @@ async def get_match_suggestions(
     Otherwise, use current user's profile skills/learning.
     """
     # 1. Get current user profile
-    current_user_ref = db.collection("users").document(current_user_id)
-    current_user_doc = current_user_ref.get()
+    current_user_doc = await users_repo.get(current_user_id)
     if not current_user_doc.exists:
         raise HTTPException(status_code=404, detail="skillshare_data_models.User not found")
     
@@ -1020,44 +1194,43 @@ async def get_match_suggestions(
     
     # Use custom search params if provided, otherwise use profile
     if learn:
-        wants_to_learn = set([s.strip().lower() for s in learn.split(",")])
+        wants_to_learn = normalize_terms(learn.split(","))
     else:
-        wants_to_learn = set([s.lower() for s in current_user.get("learning", [])])
+        wants_to_learn = normalize_terms(current_user.get("learning", []))
     
     if teach:
-        user_teaches = set([s.strip().lower() for s in teach.split(",")])
+        user_teaches = normalize_terms(teach.split(","))
     else:
-        user_teaches = set([s.lower() for s in current_user.get("skills", [])])
+        user_teaches = normalize_terms(current_user.get("skills", []))
     
-    # 2. Get all other users
-    users_ref = db.collection("users")
-    docs = users_ref.stream()
+    # 2. Score only users sharing at least one term (inverted index + top-k heap)
+    if not skill_index.ready:
+        await run_blocking(load_user_indexes)
     
-    suggestions = []
+    top_matches = skill_index.top_matches(
+        wants_to_learn, user_teaches, calculate_match_score, limit, exclude=current_user_id
+    )
+    if not top_matches:
+        return []
     
-    for doc in docs:
-        if doc.id == current_user_id:
+    # 3. Fetch full profiles for the winners only
+    user_docs = {doc.id: doc for doc in await users_repo.get_many([uid for uid, _ in top_matches])}
+    
+    suggestions = []
+    for user_id, match_percentage in top_matches:
+        doc = user_docs.get(user_id)
+        if doc is None or not doc.exists:
+            skill_index.remove(user_id)
             continue
-            
         user_data = doc.to_dict()
-        user_skills = set([s.lower() for s in user_data.get("skills", [])])
-        other_wants = set([s.lower() for s in user_data.get("learning", [])])
-        
-        # 3. Calculate match score
-        match_percentage = calculate_match_score(wants_to_learn, user_teaches, user_skills, other_wants)
-        
-        if match_percentage > 0:
-            # Store ID explicitly
-            user_data['id'] = doc.id
-            # Store match score properly
-            user_data['trustScore'] = match_percentage
-            user_data['matchScore'] = match_percentage
-            suggestions.append(user_data)
-            
-    # Sort by match score descending
-    suggestions.sort(key=lambda x: x.get('matchScore', 0), reverse=True)
+        # Store ID explicitly
+        user_data['id'] = user_id
+        # Store match score properly
+        user_data['trustScore'] = match_percentage
+        user_data['matchScore'] = match_percentage
+        suggestions.append(user_data)
     
-    return [skillshare_data_models.User(**s) for s in suggestions[:limit]]
+    return trusted_response(skillshare_data_models.User, suggestions)
 
 
 # --- Saved Matches ---
@@ -1065,10 +1238,9 @@ async def get_match_suggestions(
 async def save_match(matchedUserId: str, current_user_id: str = Depends(get_current_user)):
     """Save a match for later reference."""
     # Check if already saved
-    saved_ref = db.collection("savedMatches")
-    existing = saved_ref.where("userId", "==", current_user_id).where("matchedUserId", "==", matchedUserId).limit(1).stream()
+    existing = saved_matches_repo.where("userId", "==", current_user_id).where("matchedUserId", "==", matchedUserId)
     
-    if list(existing):
+    if await saved_matches_repo.exists(existing):
         raise HTTPException(status_code=400, detail="Match already saved")
     
     # Create saved match
@@ -1078,15 +1250,14 @@ async def save_match(matchedUserId: str, current_user_id: str = Depends(get_curr
         matchedUserId=matchedUserId
     )
     
-    doc_ref = db.collection("savedMatches").document(saved_match.id)
-    doc_ref.set(saved_match.dict())
+    await saved_matches_repo.set(saved_match.id, saved_match.dict())
     
     # --- Mutual Matching Logic ---
     # Check if the other user has already saved the current user
-    reciprocal = saved_ref.where("userId", "==", matchedUserId).where("matchedUserId", "==", current_user_id).limit(1).stream()
+    reciprocal = saved_matches_repo.where("userId", "==", matchedUserId).where("matchedUserId", "==", current_user_id)
     is_mutual = False
     
-    if list(reciprocal):
+    if await saved_matches_repo.exists(reciprocal):
         is_mutual = True
         # Create a Match record
         match_id = f"{min(current_user_id, matchedUserId)}_{max(current_user_id, matchedUserId)}"
@@ -1097,7 +1268,7 @@ async def save_match(matchedUserId: str, current_user_id: str = Depends(get_curr
             score=100.0, # Target 100 on mutual
             status=skillshare_data_models.MatchStatus.ACCEPTED
         )
-        db.collection("matches").document(match_id).set(match_data.dict())
+        await matches_repo.set(match_id, match_data.dict())
         
         # Create an initial Session
         session_id = str(uuid.uuid4())
@@ -1110,7 +1281,11 @@ async def save_match(matchedUserId: str, current_user_id: str = Depends(get_curr
             duration=30,
             status=skillshare_data_models.SessionStatus.SCHEDULED
         )
-        db.collection("sessions").document(session_id).set(new_session.dict())
+        await sessions_repo.set(session_id, new_session.dict())
+        session_reminders.schedule(session_id, new_session.dict())
+        daily_changes = user_stats.session_daily_changes(None, new_session.dict())
+        daily_changes.setdefault(user_stats.day_key(match_data.createdAt), {})["matches"] = 1
+        await user_stats.increment([current_user_id, matchedUserId], daily=daily_changes)
 
         # Emit Mutual Match notifications
         await sio.emit("new_match", {"partnerId": matchedUserId}, room=current_user_id)
@@ -1127,29 +1302,18 @@ async def save_match(matchedUserId: str, current_user_id: str = Depends(get_curr
             "room": room,
             "type": "match_confirmation"
         }
-        db.collection("messages").add(match_msg)
+        await record_message(match_msg, [current_user_id, matchedUserId])
         
         # Broadcast to room and individuals
-        await sio.emit("receive_message", {
-            **match_msg,
-            "timestamp": match_msg["timestamp"].isoformat()
-        }, room=room)
-        await sio.emit("receive_message", {
+        await notifier.emit("receive_message", {
             **match_msg,
             "timestamp": match_msg["timestamp"].isoformat()
-        }, room=current_user_id)
-        await sio.emit("receive_message", {
-            **match_msg,
-            "timestamp": match_msg["timestamp"].isoformat()
-        }, room=matchedUserId)
+        }, [room, current_user_id, matchedUserId])
 
     # Award XP for connecting
-    user_ref = db.collection("users").document(current_user_id)
-    user_doc_snap = user_ref.get()
-    user_doc = user_doc_snap.to_dict()
+    # (also checks role of matched user to decide XP)
+    matched_user_doc_snap = await users_repo.get(matchedUserId)
     
-    # Check role of matched user to decide XP
-    matched_user_doc_snap = db.collection("users").document(matchedUserId).get()
     xp_to_add = 20 # Default "learn" connect
     streak_bonus = 0
     
@@ -1163,13 +1327,12 @@ async def save_match(matchedUserId: str, current_user_id: str = Depends(get_curr
     if is_mutual:
         xp_to_add += 50
     
-    new_bonus_xp = user_doc.get("bonusXp", 0) + xp_to_add
-    new_streak = user_doc.get("streak", 0) + streak_bonus
-    
-    user_ref.update({
-        "bonusXp": new_bonus_xp,
-        "streak": new_streak
-    })
+    await xp_ledger.apply([Award(
+        current_user_id, "match_saved", {"bonusXp": xp_to_add, "streak": streak_bonus},
+        source_id=saved_match.id
+    )])
+    invalidate_user_cache(current_user_id)
+    leaderboard.increment(current_user_id, {"streak": streak_bonus})
     
     return {
         "message": "Match saved successfully", 
@@ -1184,8 +1347,7 @@ async def save_match(matchedUserId: str, current_user_id: str = Depends(get_curr
 async def get_saved_matches(current_user_id: str = Depends(get_current_user)):
     """Get all saved matches for the current user with full user data."""
     # Get saved match records
-    saved_ref = db.collection("savedMatches")
-    saved_docs = saved_ref.where("userId", "==", current_user_id).stream()
+    saved_docs = await saved_matches_repo.fetch(saved_matches_repo.where("userId", "==", current_user_id))
     
     matched_user_ids = [doc.to_dict().get("matchedUserId") for doc in saved_docs]
     
@@ -1193,14 +1355,14 @@ async def get_saved_matches(current_user_id: str = Depends(get_current_user)):
         return []
     
     # 2. Fetch full user data in BATCH for efficiency (Zero N+1)
-    users_ref = db.collection("users")
-    user_refs = [users_ref.document(uid) for uid in matched_user_ids]
-    user_docs = db.get_all(user_refs)
+    # (current user fetched once alongside for score calculation)
+    user_docs, current_user_doc = await asyncio.gather(
+        users_repo.get_many(matched_user_ids),
+        users_repo.get(current_user_id),
+    )
     
     saved_users = []
     
-    # Fetch current user once for score calculation
-    current_user_doc = users_ref.document(current_user_id).get()
     current_user = current_user_doc.to_dict() if current_user_doc.exists else {}
     wants_to_learn = set([s.lower() for s in current_user.get("learning", [])])
     user_teaches_set = set([s.lower() for s in current_user.get("skills", [])])
@@ -1219,18 +1381,19 @@ async def get_saved_matches(current_user_id: str = Depends(get_current_user)):
             user_data['matchScore'] = match_percentage
             saved_users.append(user_data)
     
-    return [skillshare_data_models.User(**u) for u in saved_users]
+    return trusted_response(skillshare_data_models.User, saved_users)
 
 
 @app.delete("/matches/saved/{matchedUserId}")
 async def unsave_match(matchedUserId: str, current_user_id: str = Depends(get_current_user)):
     """Remove a saved match."""
-    saved_ref = db.collection("savedMatches")
-    docs = saved_ref.where("userId", "==", current_user_id).where("matchedUserId", "==", matchedUserId).stream()
+    docs = await saved_matches_repo.fetch(
+        saved_matches_repo.where("userId", "==", current_user_id).where("matchedUserId", "==", matchedUserId)
+    )
     
     deleted = False
     for doc in docs:
-        doc.reference.delete()
+        await saved_matches_repo.delete(doc.id)
         deleted = True
     
     if not deleted:
@@ -1240,75 +1403,53 @@ async def unsave_match(matchedUserId: str, current_user_id: str = Depends(get_cu
 
 
 # --- Leaderboard ---
+async def iter_leaderboard(metric: str, page_size: int = 500):
+    """The full ranking for `metric`, read from the leaderboard a page at a time"""
+    offset = 0
+    while True:
+        entries = leaderboard.top(metric, page_size, offset)
+        for entry in entries:
+            yield entry
+        if len(entries) < page_size:
+            return
+        offset += page_size
+
 @app.get("/leaderboard")
-async def get_leaderboard(sortBy: str = "xp", current_user_id: str = Depends(get_current_user)):
+async def get_leaderboard(request: Request, sortBy: str = "xp", current_user_id: str = Depends(get_current_user)):
     """
     Get leaderboard rankings sorted by XP or streak.
     Returns top 50 users and current user's rank.
+    With `Accept: application/x-ndjson` the full ranking is streamed instead, one entry per line.
     """
     # Validate sortBy parameter
     if sortBy not in ["xp", "streak"]:
         raise HTTPException(status_code=400, detail="sortBy must be 'xp' or 'streak'")
     
-    # Fetch all users
-    users_ref = db.collection("users")
-    docs = users_ref.stream()
-    
-    all_users = []
-    current_user_data = None
-    
-    for doc in docs:
-        user_data = doc.to_dict()
-        user_data['id'] = doc.id
-        
-        # Store current user separately
-        if doc.id == current_user_id:
-            current_user_data = user_data
-        
-        all_users.append(user_data)
-    
-    # Sort by the specified metric (descending)
-    sort_key = "xp" if sortBy == "xp" else "streak"
-    all_users.sort(key=lambda x: x.get(sort_key, 0), reverse=True)
+    # Served from the materialized leaderboard (no Firestore scan)
+    if not leaderboard.ready:
+        await run_blocking(load_user_indexes)
+    
+    def format_entry(entry, default_name):
+        return {
+            "rank": entry['rank'],
+            "id": entry['id'],
+            "name": entry.get('name') or default_name,
+            "avatar": entry.get('avatar'),
+            "country": entry.get('location') or entry.get('country') or '',
+            "xp": entry.get('xp', 0),
+            "matches": entry.get('sessions', 0),  # Using sessions as matches
+            "streak": entry.get('streak', 0)
+        }
     
-    # Assign ranks
-    for index, user in enumerate(all_users):
-        user['rank'] = index + 1
+    if wants_ndjson(request):
+        return ndjson_response(iter_leaderboard(sortBy), lambda entry: format_entry(entry, 'Unknown'))
     
     # Get top 50 leaders
-    top_leaders = all_users[:50]
-    
-    # Format leaders for response
-    leaders = []
-    for user in top_leaders:
-        leaders.append({
-            "rank": user['rank'],
-            "id": user['id'],
-            "name": user.get('name', 'Unknown'),
-            "avatar": user.get('avatar'),
-            "country": user.get('location') or user.get('country', ''),
-            "xp": user.get('xp', 0),
-            "matches": user.get('sessions', 0),  # Using sessions as matches
-            "streak": user.get('streak', 0)
-        })
+    leaders = [format_entry(entry, 'Unknown') for entry in leaderboard.top(sortBy, 50)]
     
     # Find current user's rank
-    current_user_rank = None
-    if current_user_data:
-        # Find user in sorted list
-        for user in all_users:
-            if user['id'] == current_user_id:
-                current_user_rank = {
-                    "rank": user['rank'],
-                    "id": user['id'],
-                    "name": user.get('name', 'You'),
-                    "avatar": user.get('avatar'),
-                    "country": user.get('location') or user.get('country', ''),
-                    "xp": user.get('xp', 0),
-                    "matches": user.get('sessions', 0),
-                    "streak": user.get('streak', 0)
-                }
-                break
+    current_entry = leaderboard.rank_of(sortBy, current_user_id)
+    current_user_rank = format_entry(current_entry, 'You') if current_entry else None
     
     return {
         "leaders": leaders,
@@ -1317,55 +1458,29 @@ async def get_leaderboard(sortBy: str = "xp", current_user_id: str = Depends(get
 
 
 # --- Messages & Contacts ---
-@app.get("/messages/history/{other_user_id}")
-async def get_chat_history(other_user_id: str, current_user_id: str = Depends(get_current_user)):
-    """Fetch message history between current user and another user."""
-    # Room name is typically sorted IDs
-    room = "_".join(sorted([current_user_id, other_user_id]))
-    
-    messages_ref = db.collection("messages")
-    print(f"[DEBUG] Fetching history for room {room}")
-    # Query messages where room matches (sorting in memory to avoid index requirement)
-    query = messages_ref.where("room", "==", room).stream()
-    
-    history = []
-    for doc in query:
-        msg = doc.to_dict()
-        msg['id'] = doc.id
-        history.append(msg)
-    
-    # Sort in memory by timestamp
-    history.sort(key=lambda x: x.get('timestamp') or datetime.min)
-    
-    # Convert timestamps to ISO for JSON
-    for msg in history:
-        if isinstance(msg.get('timestamp'), datetime):
-             msg['timestamp'] = msg['timestamp'].isoformat()
-             
-    return history
-
 @app.get("/messages/contacts")
 async def get_chat_contacts(current_user_id: str = Depends(get_current_user)):
     """Fetch list of users the current user has a MUTUAL match with."""
-    matches_ref = db.collection("matches")
-    
     # Query for accepted matches where the current user is either user1 or user2
-    m1 = matches_ref.where("user1Id", "==", current_user_id).where("status", "==", "ACCEPTED").stream()
-    m2 = matches_ref.where("user2Id", "==", current_user_id).where("status", "==", "ACCEPTED").stream()
+    m1, m2 = await asyncio.gather(
+        matches_repo.fetch(matches_repo.where("user1Id", "==", current_user_id).where("status", "==", "ACCEPTED")),
+        matches_repo.fetch(matches_repo.where("user2Id", "==", current_user_id).where("status", "==", "ACCEPTED")),
+    )
     
     contact_ids = set()
-    for m in list(m1) + list(m2):
+    for m in m1 + m2:
         m_data = m.to_dict()
         u1 = m_data.get("user1Id")
         u2 = m_data.get("user2Id")
         contact_ids.add(u1 if u1 != current_user_id else u2)
         
+    contact_ids.discard(None)
+    contact_data_map = await user_cards.get_many(contact_ids)
+    
     contacts = []
     for uid in contact_ids:
-        if not uid: continue
-        user_doc = db.collection("users").document(uid).get()
-        if user_doc.exists:
-            u_data = user_doc.to_dict()
+        u_data = contact_data_map.get(uid)
+        if u_data:
             contacts.append({
                 "id": uid,
                 "name": u_data.get("name", "Unknown"),
@@ -1377,34 +1492,22 @@ async def get_chat_contacts(current_user_id: str = Depends(get_current_user)):
     return contacts
 
 # --- skillshare_data_models.Projects ---
-@app.get("/projects", response_model=List[skillshare_data_models.Project])
-async def get_projects():
-    projects_ref = db.collection("projects")
-    docs = projects_ref.stream()
-    projects = []
-    for doc in docs:
-        p_data = doc.to_dict()
-        p_data['id'] = doc.id # Ensure ID is present for frontend
-        projects.append(skillshare_data_models.Project(**p_data))
-    return projects
-
 @app.post("/projects", response_model=skillshare_data_models.Project)
 async def create_project(project: skillshare_data_models.Project, current_user_id: str = Depends(get_current_user)):
-    # Override owner with current user
-    user_ref = db.collection("users").document(current_user_id)
-    user_doc = user_ref.get()
-    if not user_doc.exists:
+    # Store initial invited members as pending
+    invited_ids = [uid for uid in dict.fromkeys(project.memberIds) if uid != current_user_id]
+    
+    # Owner and every invitee in one batched read
+    profiles = await user_cards.get_many([current_user_id, *invited_ids])
+    u_data = profiles.get(current_user_id)
+    if u_data is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    u_data = user_doc.to_dict()
     project.ownerName = u_data.get("name", "Unknown")
     project.ownerId = current_user_id
     project.id = str(uuid.uuid4())
-    
-    # Store initial invited members as pending
-    invited_ids = project.memberIds
     project.memberIds = [current_user_id]
-    project.pendingMemberIds = [uid for uid in invited_ids if uid != current_user_id]
+    project.pendingMemberIds = invited_ids
     
     # Fetch owner details for memberDetails
     project.memberDetails = [{
@@ -1413,104 +1516,152 @@ async def create_project(project: skillshare_data_models.Project, current_user_i
         "avatar": u_data.get("avatar")
     }]
     
-    # Send invitations via Chat
-    for invitee_id in project.pendingMemberIds:
-        room = "_".join(sorted([current_user_id, invitee_id]))
-        invite_msg = {
-            "senderId": current_user_id,
-            "receiverId": invitee_id,
-            "content": f"🚀 **Project Invite!**\nI've invited you to join my project: **{project.title}**.",
-            "timestamp": datetime.now(),
-            "read": False,
-            "room": room,
-            "type": "project_invite",
-            "isRequest": True,
-            "projectId": project.id
-        }
-        print(f"[PROJECT INVITE] Creating invitation for {invitee_id} in room {room}")
-        print(f"[PROJECT INVITE] Message data: type={invite_msg.get('type')}, isRequest={invite_msg.get('isRequest')}, projectId={invite_msg.get('projectId')}")
-        db.collection("messages").add(invite_msg)
-        
-        # Real-time notification to the room (so sender sees it)
-        print(f"[PROJECT INVITE] Emitting to room: {room}")
-        await sio.emit("receive_message", {
-            **invite_msg,
-            "timestamp": invite_msg["timestamp"].isoformat()
-        }, room=room)
-        
-        # Real-time notification to invitee's personal room
-        print(f"[PROJECT INVITE] Emitting to personal room: {invitee_id}")
-        await sio.emit("receive_message", {
-            **invite_msg,
-            "timestamp": invite_msg["timestamp"].isoformat()
-        }, room=invitee_id)
-        
-        # Send project invitation email
-        if email_service:
-            try:
-                invitee_doc = db.collection("users").document(invitee_id).get()
-                if invitee_doc.exists:
-                    invitee_data = invitee_doc.to_dict()
-                    if invitee_data.get("email"):
-                        email_project_data = {
-                            "title": project.title,
-                            "description": project.description,
-                            "stack": project.stack,
-                            "difficulty": project.difficulty,
-                            "type": project.type
-                        }
-                        email_service.send_project_invitation(
-                            email_project_data,
-                            invitee_data.get("email"),
-                            invitee_data.get("name"),
-                            u_data.get("name")
-                        )
-                        logger.info(f"Project invitation email sent to: {invitee_data.get('email')}")
-            except Exception as e:
-                logger.error(f"Failed to send project invitation email: {e}")
-                # Don't fail project creation if email fails
-
     # Adjust spots (only confirmed members count)
     project.spots = max(0, project.totalSpots - len(project.memberIds))
     
-    doc_ref = db.collection("projects").document(project.id)
-    doc_ref.set(project.dict())
+    # The project, its chat invitations and the owner's counters commit together
+    now = datetime.now()
+    invite_msgs = [{
+        "senderId": current_user_id,
+        "receiverId": invitee_id,
+        "content": f"🚀 **Project Invite!**\nI've invited you to join my project: **{project.title}**.",
+        "timestamp": now,
+        "read": False,
+        "room": "_".join(sorted([current_user_id, invitee_id])),
+        "type": "project_invite",
+        "isRequest": True,
+        "projectId": project.id
+    } for invitee_id in invited_ids]
+    
+    batch = repositories.batch()
+    batch.set(projects_repo.document(project.id), project.dict())
+    user_stats.stage_counters(batch, current_user_id, {"projectCount": 1, "messageCount": len(invite_msgs)})
+    staged = 2
+    for invite_msg in invite_msgs:
+        # Two writes per invitation; start a new commit before hitting the 500-write limit
+        if staged + 2 > 500:
+            await repositories.commit(batch)
+            batch, staged = repositories.batch(), 0
+        stage_message(batch, invite_msg, [current_user_id, invite_msg["receiverId"]], count_sender=False)
+        staged += 2
+    await repositories.commit(batch)
+    invalidate_user_cache(current_user_id)
+    invalidate_project(project.id, project.dict())
+    logger.info(f"Project {project.id} created with {len(invite_msgs)} invitations")
+    
+    # Real-time notifications to each chat room (so sender sees it) and invitee's personal room
+    await asyncio.gather(*(
+        notifier.emit("receive_message", {
+            **invite_msg,
+            "timestamp": invite_msg["timestamp"].isoformat()
+        }, [invite_msg["room"], invite_msg["receiverId"]])
+        for invite_msg in invite_msgs
+    ))
+
+    # Send project invitation emails: queued for background delivery as one bulk send
+    if email_service and invited_ids:
+        try:
+            email_project_data = {
+                "title": project.title,
+                "description": project.description,
+                "stack": project.stack,
+                "difficulty": project.difficulty,
+                "type": project.type
+            }
+            sent = email_service.send_project_invitations(
+                email_project_data,
+                [{"email": profiles[uid].get("email"), "name": profiles[uid].get("name")} for uid in invited_ids if uid in profiles],
+                u_data.get("name")
+            )
+            logger.info(f"Project invitation emails queued for {sent} invitees")
+        except Exception as e:
+            logger.error(f"Failed to send project invitation emails: {e}")
+            # Don't fail project creation if email fails
     
     return project
 
+async def iter_projects(after=None, page_size: int = 500, **filters):
+    """Every project matching `filters` after the `after` key, read from the index a page at a time"""
+    while True:
+        projects, after = project_index.query(after=after, limit=page_size, **filters)
+        for project in projects:
+            yield project
+        if after is None:
+            return
+
 @app.get("/projects", response_model=List[skillshare_data_models.Project])
-async def get_projects(current_user_id: str = Depends(get_current_user)):
-    """Get all projects"""
+async def get_projects(
+    request: Request,
+    stack: Optional[List[str]] = Query(None),
+    difficulty: Optional[List[str]] = Query(None),
+    type: Optional[List[str]] = Query(None),
+    open: bool = False,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+):
+    """
+    One page of projects, newest first, from the in-memory project index.
+    
+    Repeating a filter (?stack=React&stack=Vue) matches any of the values;
+    different filters must all match. `open=true` keeps projects with spots
+    left. Pass the X-Next-Cursor response header back as `cursor` for the
+    next page. With `Accept: application/x-ndjson` every match from the
+    cursor on is streamed, one project per line, and `limit` is ignored.
+    """
     try:
-        logger.info(f"Fetching all projects for user: {current_user_id}")
-        
-        projects_ref = db.collection("projects")
-        projects = []
-        
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None and not (
+            len(after) == 2 and isinstance(after[0], (int, float)) and isinstance(after[1], str)
+        ):
+            raise ValueError("Invalid cursor")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if not project_index.ready:
         try:
-            for doc in projects_ref.stream():
-                project_data = doc.to_dict()
-                project_data['id'] = doc.id
-                projects.append(skillshare_data_models.Project(**project_data))
-                logger.info(f"Found project: {doc.id} - {project_data.get('title')}")
+            await run_blocking(load_project_index)
         except GoogleCloudError as e:
-            logger.error(f"Firestore error fetching projects: {e}", exc_info=True)
+            logger.error(f"Firestore error building project index: {e}", exc_info=True)
             raise HTTPException(
                 status_code=503,
                 detail="Database temporarily unavailable. Please try again later."
             )
-        
-        logger.info(f"Successfully fetched {len(projects)} projects")
-        return projects
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error fetching projects: {e}", exc_info=True)
+    
+    filters = {"stack": stack, "difficulty": difficulty, "type": type, "open_only": open}
+    if wants_ndjson(request):
+        return ndjson_response(iter_projects(after, **filters), lambda p: trusted(skillshare_data_models.Project, p))
+    
+    projects, next_key = project_index.query(after=after, limit=clamp_page_size(limit), **filters)
+    headers = {"X-Next-Cursor": encode_cursor(*next_key)} if next_key else None
+    return trusted_response(skillshare_data_models.Project, projects, headers)
+
+async def fetch_user_projects(user_id: str, field: str = "memberIds") -> list:
+    """Projects whose `field` (memberIds or pendingMemberIds) contains the user, newest first"""
+    query = (
+        projects_repo.where(field, "array_contains", user_id)
+        .order_by("createdAt", direction="DESCENDING")
+    )
+    return await projects_repo.fetch(query)
+
+@app.get("/projects/mine", response_model=List[skillshare_data_models.Project])
+async def get_my_projects(include_invites: bool = False, current_user_id: str = Depends(get_current_user)):
+    """Projects the current user is a member of (and, optionally, invited to)"""
+    try:
+        queries = [fetch_user_projects(current_user_id)]
+        if include_invites:
+            queries.append(fetch_user_projects(current_user_id, "pendingMemberIds"))
+        results = await asyncio.gather(*queries)
+    except GoogleCloudError as e:
+        logger.error(f"Firestore error fetching projects for {current_user_id}: {e}", exc_info=True)
         raise HTTPException(
-            status_code=500,
-            detail="Failed to fetch projects. Please try again later."
+            status_code=503,
+            detail="Database temporarily unavailable. Please try again later."
         )
+    
+    return trusted_response(
+        skillshare_data_models.Project,
+        ({**doc.to_dict(), "id": doc.id} for docs in results for doc in docs)
+    )
 
 @app.delete("/projects/{project_id}")
 async def delete_project(project_id: str, current_user_id: str = Depends(get_current_user)):
@@ -1520,8 +1671,7 @@ async def delete_project(project_id: str, current_user_id: str = Depends(get_cur
         
         # Get project
         try:
-            project_ref = db.collection("projects").document(project_id)
-            project_doc = project_ref.get()
+            project_doc = await projects_repo.get(project_id)
             logger.info(f"Project document exists: {project_doc.exists}")
         except GoogleCloudError as e:
             logger.error(f"Firestore error fetching project {project_id}: {e}", exc_info=True)
@@ -1533,7 +1683,7 @@ async def delete_project(project_id: str, current_user_id: str = Depends(get_cur
         if not project_doc.exists:
             logger.warning(f"Project not found: {project_id}")
             # List all projects to debug
-            all_projects = list(db.collection("projects").stream())
+            all_projects = await projects_repo.fetch(projects_repo.collection.limit(5))
             logger.info(f"Total projects in database: {len(all_projects)}")
             for p in all_projects[:5]:  # Log first 5 projects
                 logger.info(f"  - Project ID: {p.id}, Title: {p.to_dict().get('title')}")
@@ -1552,7 +1702,7 @@ async def delete_project(project_id: str, current_user_id: str = Depends(get_cur
         
         # Delete the project
         try:
-            project_ref.delete()
+            await projects_repo.delete(project_id)
             logger.info(f"Successfully deleted project {project_id} by owner {current_user_id}")
         except GoogleCloudError as e:
             logger.error(f"Firestore error deleting project {project_id}: {e}", exc_info=True)
@@ -1561,6 +1711,12 @@ async def delete_project(project_id: str, current_user_id: str = Depends(get_cur
                 detail="Failed to delete project. Please try again later."
             )
         
+        invalidate_project(project_id)
+        member_ids = project_data.get("memberIds", [])
+        await user_stats.increment(member_ids, counters={"projectCount": -1})
+        for member_id in member_ids:
+            invalidate_user_cache(member_id)
+        
         return {"message": "Project deleted successfully"}
         
     except HTTPException:
@@ -1574,8 +1730,7 @@ async def delete_project(project_id: str, current_user_id: str = Depends(get_cur
 
 @app.post("/projects/{project_id}/accept-invite")
 async def accept_project_invite(project_id: str, current_user_id: str = Depends(get_current_user)):
-    doc_ref = db.collection("projects").document(project_id)
-    doc = doc_ref.get()
+    doc = await projects_repo.get(project_id)
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -1595,14 +1750,13 @@ async def accept_project_invite(project_id: str, current_user_id: str = Depends(
     members.append(current_user_id)
     
     # Update memberDetails
-    user_doc = db.collection("users").document(current_user_id).get()
-    user_data = user_doc.to_dict() if user_doc.exists else {}
+    card = await user_cards.get(current_user_id)
     
     member_details = project_data.get("memberDetails", [])
     member_details.append({
         "id": current_user_id,
-        "name": user_data.get("name", "User"),
-        "avatar": user_data.get("avatar")
+        "name": card.get("name", "User") if card else "User",
+        "avatar": card.avatar if card else None
     })
     
     updates = {
@@ -1612,7 +1766,10 @@ async def accept_project_invite(project_id: str, current_user_id: str = Depends(
         "spots": project_data.get("totalSpots", 4) - len(members)
     }
     
-    doc_ref.update(updates)
+    await projects_repo.update(project_id, updates)
+    invalidate_project(project_id, {**project_data, **updates})
+    await user_stats.increment([current_user_id], counters={"projectCount": 1})
+    invalidate_user_cache(current_user_id)
     
     # Send confirmation message
     owner_id = project_data.get("ownerId")
@@ -1625,18 +1782,17 @@ async def accept_project_invite(project_id: str, current_user_id: str = Depends(
         "read": False,
         "room": room
     }
-    db.collection("messages").add(confirm_msg)
-    await sio.emit("receive_message", {
+    await record_message(confirm_msg, [current_user_id, owner_id])
+    await notifier.emit("receive_message", {
         **confirm_msg,
         "timestamp": confirm_msg["timestamp"].isoformat()
-    }, room=owner_id)
+    }, [owner_id])
 
     return {"message": "Joined project successfully"}
 
 @app.post("/projects/{project_id}/join")
 async def join_project(project_id: str, current_user_id: str = Depends(get_current_user)):
-    doc_ref = db.collection("projects").document(project_id)
-    doc = doc_ref.get()
+    doc = await projects_repo.get(project_id)
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -1659,8 +1815,7 @@ async def join_project(project_id: str, current_user_id: str = Depends(get_curre
     is_invited = current_user_id in pending_ids
     
     if not is_invited:
-        msg_check = db.collection("messages").where("room", "==", room).limit(1).stream()
-        if not list(msg_check):
+        if not await messages_repo.exists(messages_repo.where("room", "==", room)):
             raise HTTPException(status_code=403, detail="Only mutual contacts (people you've messaged) can join")
 
     # Add member and remove from pending if present
@@ -1669,14 +1824,13 @@ async def join_project(project_id: str, current_user_id: str = Depends(get_curre
         pending_ids.remove(current_user_id)
     
     # Fetch user details
-    user_doc = db.collection("users").document(current_user_id).get()
-    user_data = user_doc.to_dict() if user_doc.exists else {}
+    card = await user_cards.get(current_user_id)
     
     member_details = project_data.get("memberDetails", [])
     member_details.append({
         "id": current_user_id,
-        "name": user_data.get("name", "User"),
-        "avatar": user_data.get("avatar")
+        "name": card.get("name", "User") if card else "User",
+        "avatar": card.avatar if card else None
     })
     
     updates = {
@@ -1686,7 +1840,10 @@ async def join_project(project_id: str, current_user_id: str = Depends(get_curre
         "spots": project_data.get("totalSpots", 4) - len(member_ids)
     }
     
-    doc_ref.update(updates)
+    await projects_repo.update(project_id, updates)
+    invalidate_project(project_id, {**project_data, **updates})
+    await user_stats.increment([current_user_id], counters={"projectCount": 1})
+    invalidate_user_cache(current_user_id)
     
     # Send confirmation if they joined via general "Join" button but were invited
     if is_invited:
@@ -1698,19 +1855,17 @@ async def join_project(project_id: str, current_user_id: str = Depends(get_curre
             "read": False,
             "room": room
         }
-         db.collection("messages").add(confirm_msg)
-         await sio.emit("receive_message", {
+         await record_message(confirm_msg, [current_user_id, owner_id])
+         await notifier.emit("receive_message", {
             **confirm_msg,
             "timestamp": confirm_msg["timestamp"].isoformat()
-        }, room=owner_id)
+        }, [owner_id])
 
     return {"message": "Joined project successfully"}
 
 @app.post("/test/set-my-stats")
 async def test_set_stats(current_user_id: str = Depends(get_current_user)):
     """TEST ENDPOINT: Manually set user stats to verify display is working"""
-    doc_ref = db.collection("users").document(current_user_id)
-    
     updates = {
         "xp": 250,
         "sessions": 5,
@@ -1718,13 +1873,20 @@ async def test_set_stats(current_user_id: str = Depends(get_current_user)):
         "level": 3
     }
     
-    doc_ref.update(updates)
+    await users_repo.update(current_user_id, updates)
+    invalidate_user_cache(current_user_id)
+    leaderboard.upsert(current_user_id, updates)
     
     return {
         "message": "✅ Test stats set successfully! Refresh your dashboard to see changes.",
         "stats": updates
     }
 
+# Registered last so the shutdown hooks above can still flush through the executor
+@app.on_event("shutdown")
+async def stop_repositories():
+    repositories.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(socket_app, host="0.0.0.0", port=8000)
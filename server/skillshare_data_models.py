@@ -68,9 +68,9 @@ class User(BaseModel):
     teachingBlueprint: Optional[TeachingBlueprint] = None
     lastCheckIn: Optional[datetime] = None
     
-    # Trust Score Ratings (internal storage for avg calculation)
-    # List of { raterId: str, score: float }
-    ratings: List[dict] = []
+    # Trust Score Ratings: per-rater scores live in users/{uid}/ratings,
+    # only the running aggregates are kept on the profile
+    ratingCount: int = 0
 
     createdAt: datetime = Field(default_factory=datetime.now)
     updatedAt: datetime = Field(default_factory=datetime.now)
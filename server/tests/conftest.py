@@ -0,0 +1,32 @@
+"""
+Shared fixtures: the in-memory Firestore from tests/fake_firestore.py.
+
+core.firebase_config connects to a real project at import time, so it is
+replaced before any core module is imported.
+"""
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fake_firestore import FakeFirestore  # noqa: E402
+
+fake_db = FakeFirestore()
+sys.modules["core.firebase_config"] = types.SimpleNamespace(db=fake_db)
+
+
+@pytest.fixture
+def db():
+    """The fake Firestore, emptied for each test, with the user card cache cleared."""
+    from core.user_cards import user_cards
+    user_cards.cache.clear()
+    with fake_db.lock:
+        fake_db.docs = {}
+        fake_db.update_times = {}
+        fake_db.commits = 0
+        fake_db.round_trips = 0
+        fake_db.queries = []
+    return fake_db
@@ -0,0 +1,299 @@
+"""
+An in-memory stand-in for the Firestore client, shared by the tests and the benchmarks.
+
+It implements just the client surface the core modules use (documents,
+queries, batches, get_all) and applies each batch atomically, with
+Increment/DELETE_FIELD/SERVER_TIMESTAMP semantics and last_update_time
+preconditions. Every network round-trip (a read, a query, a commit) is
+counted, and with `latency` set it blocks the calling thread for that long,
+as the gRPC client does.
+
+Install it before any core module is imported, since core.firebase_config
+connects to a real project at import time:
+
+    sys.modules["core.firebase_config"] = types.SimpleNamespace(db=FakeFirestore())
+"""
+import threading
+import time
+import types
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return None if self._data is None else _copy(self._data)
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._db, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None):
+        self._db.round_trip()
+        return self._read(field_paths)
+
+    def _read(self, field_paths=None):
+        with self._db.lock:
+            data = self._db.docs.get(self.path)
+            if data is not None and field_paths is not None:
+                data = {f: data[f] for f in field_paths if f in data}
+            return FakeSnapshot(self, _copy(data), self._db.update_times.get(self.path))
+
+    def set(self, data, merge=False):
+        batch = self._db.batch()
+        batch.set(self, data, merge=merge)
+        batch.commit()
+
+    def update(self, data, option=None):
+        batch = self._db.batch()
+        batch.update(self, data, option=option)
+        batch.commit()
+
+    def delete(self):
+        self._db.round_trip()
+        with self._db.lock:
+            self._db.docs.pop(self.path, None)
+            self._db.update_times.pop(self.path, None)
+
+
+class FakeCollection:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    def document(self, doc_id=None):
+        if doc_id is None:
+            doc_id = self._db.next_id()
+        return FakeDocument(self._db, f"{self.path}/{doc_id}")
+
+    def select(self, field_paths):
+        return FakeQuery(self).select(field_paths)
+
+    def where(self, field, op, value):
+        return FakeQuery(self).where(field, op, value)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return FakeQuery(self).order_by(field, direction)
+
+    def limit(self, count):
+        return FakeQuery(self).limit(count)
+
+    def stream(self):
+        return FakeQuery(self).stream()
+
+
+_OPERATORS = {
+    "==": lambda value, operand: value == operand,
+    "in": lambda value, operand: value in operand,
+    "array_contains": lambda value, operand: isinstance(value, list) and operand in value,
+}
+
+
+class FakeQuery:
+    """
+    Immutable query over one collection. `projection` keeps what select() was
+    given; like Firestore, an empty projection returns every field and
+    ["__name__"] returns none.
+    """
+
+    def __init__(self, collection, projection=None, filters=(), orders=(), after=None, count=None):
+        self._collection = collection
+        self.projection = projection
+        self.filters = filters
+        self.orders = orders
+        self.after = after
+        self.count = count
+
+    def _with(self, **changes):
+        fields = dict(projection=self.projection, filters=self.filters, orders=self.orders,
+                      after=self.after, count=self.count)
+        fields.update(changes)
+        return FakeQuery(self._collection, **fields)
+
+    def select(self, field_paths):
+        return self._with(projection=list(field_paths))
+
+    def where(self, field, op, value):
+        return self._with(filters=self.filters + ((field, _OPERATORS[op], value),))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._with(orders=self.orders + ((field, direction == "DESCENDING"),))
+
+    def start_after(self, values):
+        return self._with(after=list(values))
+
+    def limit(self, count):
+        return self._with(count=count)
+
+    def _past_cursor(self, path, data):
+        for (field, descending), cursor in zip(self.orders, self.after):
+            value = path.rsplit("/", 1)[-1] if field == "__name__" else data.get(field)
+            if value != cursor:
+                return value < cursor if descending else value > cursor
+        return False
+
+    def stream(self):
+        db = self._collection._db
+        db.round_trip()
+        db.queries.append(self)
+        prefix = self._collection.path + "/"
+        with db.lock:
+            rows = [
+                (path, _copy(data), db.update_times.get(path)) for path, data in sorted(db.docs.items())
+                if path.startswith(prefix) and "/" not in path[len(prefix):]
+                and all(test(data.get(field), operand) for field, test, operand in self.filters)
+            ]
+        for field, descending in reversed(self.orders):
+            key = (lambda row: row[0].rsplit("/", 1)[-1]) if field == "__name__" else (lambda row: row[1].get(field))
+            rows.sort(key=key, reverse=descending)
+        if self.after is not None:
+            rows = [row for row in rows if self._past_cursor(row[0], row[1])]
+        if self.count is not None:
+            rows = rows[:self.count]
+        for path, data, update_time in rows:
+            if self.projection:
+                data = {f: data[f] for f in self.projection if f in data}
+            yield FakeSnapshot(FakeDocument(db, path), data, update_time)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append(("set", ref.path, data, merge, None))
+
+    def create(self, ref, data):
+        self.writes.append(("create", ref.path, data, False, None))
+
+    def update(self, ref, data, option=None):
+        self.writes.append(("update", ref.path, data, True, option))
+
+    def delete(self, ref):
+        self.writes.append(("delete", ref.path, None, False, None))
+
+    def commit(self):
+        self._db.round_trip()
+        with self._db.lock:
+            self._db.commits += 1
+            docs = dict(self._db.docs)
+            update_times = dict(self._db.update_times)
+            self._db.clock += 1
+            for op, path, data, merge, option in self.writes:
+                if op == "create" and path in docs:
+                    raise AlreadyExists(f"Document already exists: {path}")
+                if op == "update" and path not in docs:
+                    raise NotFound(f"No document to update: {path}")
+                if option is not None and update_times.get(path) != option.last_update_time:
+                    raise FailedPrecondition(f"Document changed since it was read: {path}")
+                if op == "delete":
+                    docs.pop(path, None)
+                    update_times.pop(path, None)
+                    continue
+                base = _copy(docs[path]) if merge and path in docs else {}
+                docs[path] = _update(base, data) if op == "update" else _apply(base, data)
+                update_times[path] = self._db.clock
+            self._db.docs = docs
+            self._db.update_times = update_times
+        return []
+
+
+class FakeFirestore:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.round_trips = 0
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.update_times = {}
+        self.clock = 0
+        self.commits = 0
+        self.queries = []
+        self._ids = 0
+
+    def round_trip(self):
+        """One request to the server: counted, and blocking the calling thread for `latency`."""
+        with self.lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def next_id(self):
+        with self.lock:
+            self._ids += 1
+            return f"doc{self._ids:06d}"
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def write_option(self, last_update_time=None):
+        return types.SimpleNamespace(last_update_time=last_update_time)
+
+    def get_all(self, refs, field_paths=None):
+        # One batched read for all of `refs`
+        self.round_trip()
+        for ref in refs:
+            yield ref._read(field_paths)
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _apply(target: dict, changes: dict) -> dict:
+    for key, value in changes.items():
+        if value is firestore.DELETE_FIELD:
+            target.pop(key, None)
+        elif value is firestore.SERVER_TIMESTAMP:
+            target[key] = datetime.now(timezone.utc)
+        elif isinstance(value, firestore.Increment):
+            target[key] = (target.get(key) or 0) + value.value
+        elif isinstance(value, dict):
+            current = target.get(key)
+            target[key] = _apply(current if isinstance(current, dict) else {}, value)
+        else:
+            target[key] = _copy(value)
+    return target
+
+
+def _update(target: dict, changes: dict) -> dict:
+    # update() keys are dotted field paths and replace the value at that path
+    for key, value in changes.items():
+        *parents, leaf = key.split(".")
+        node = target
+        for part in parents:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if isinstance(value, dict):
+            node.pop(leaf, None)
+        _apply(node, {leaf: value})
+    return target
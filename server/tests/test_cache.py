@@ -0,0 +1,20 @@
+from core.cache import TTLCache
+
+
+def test_oversized_write_replaces_the_cached_value():
+    cache = TTLCache("test", max_bytes=1000, sizeof=len)
+    cache.set("user", "x" * 100)
+
+    cache.set("user", "x" * 2000)
+
+    assert cache.get("user") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_uncacheable_ttl_drops_the_previous_value():
+    cache = TTLCache("test", sizeof=len)
+    cache.set("user", "old")
+
+    cache.set("user", "new", ttl=0)
+
+    assert "user" not in cache
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from core.email_outbox import EmailOutbox, FakeTransport
+
+
+class MemoryStore:
+    def __init__(self):
+        self.docs = {}
+
+    async def set(self, doc_id, data, merge=False):
+        self.docs[doc_id] = data
+
+    async def delete(self, doc_id):
+        self.docs.pop(doc_id, None)
+
+
+def test_enqueue_without_a_loop_queues_nothing():
+    outbox = EmailOutbox(FakeTransport(), store=MemoryStore())
+
+    with pytest.raises(RuntimeError):
+        outbox.enqueue("ada@example.com", "Hello", "<p>Hi</p>")
+
+    # The caller falls back to sending directly, so the job must not also be queued
+    assert outbox.stats()["queueDepth"] == 0
+
+
+def test_enqueued_job_is_delivered_once():
+    transport = FakeTransport()
+    store = MemoryStore()
+
+    async def run():
+        outbox = EmailOutbox(transport, store=store, workers=2)
+        await outbox.start()
+        outbox.enqueue("ada@example.com", "Hello", "<p>Hi</p>")
+        await outbox.stop()
+
+    asyncio.run(run())
+    assert [job["to"] for job in transport.sent] == ["ada@example.com"]
+    assert store.docs == {}
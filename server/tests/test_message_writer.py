@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from google.api_core.exceptions import DeadlineExceeded, InvalidArgument
+
+from core import repositories
+from core.message_writer import MessageWriter
+
+
+def message(content, sender="alice", receiver="bob"):
+    return {"senderId": sender, "receiverId": receiver, "content": content, "room": "alice_bob"}
+
+
+@pytest.fixture
+def users(db):
+    for uid in ("alice", "bob"):
+        db.collection("users").document(uid).set({"name": uid.title(), "email": f"{uid}@example.com"})
+    return db
+
+
+async def write_all(writer, items):
+    writer.start()
+    for data, participants, ack in items:
+        writer.submit(data, participants, ack=ack)
+    await asyncio.wait_for(writer.stop(), 5)
+
+
+def test_bad_message_is_dead_lettered_alone(users, monkeypatch):
+    real_commit = repositories.commit
+
+    async def commit(batch):
+        if any(data.get("content") == "reject me" for _, path, data, *_ in batch.writes if path.startswith("messages/")):
+            raise InvalidArgument("value too large")
+        return await real_commit(batch)
+
+    monkeypatch.setattr(repositories, "commit", commit)
+    acks = {}
+
+    async def on_commit(ack, message_id, error):
+        acks[ack] = (message_id, error)
+
+    writer = MessageWriter(on_commit, max_delay=0.01)
+    items = [(message("reject me" if i == 6 else f"m{i}"), ["alice", "bob"], i) for i in range(10)]
+    asyncio.run(write_all(writer, items))
+
+    assert [ack for ack, (message_id, _) in acks.items() if message_id is None] == [6]
+    assert isinstance(acks[6][1], InvalidArgument)
+    stored = [data["content"] for path, data in sorted(users.docs.items()) if path.startswith("messages/")]
+    assert stored == [f"m{i}" for i in range(10) if i != 6]
+    assert users.docs["users/alice"]["messageCount"] == 9
+    assert writer.stats()["deadLetters"] == 1
+
+
+def test_unstageable_message_does_not_stop_the_writer(db):
+    acks = {}
+
+    async def on_commit(ack, message_id, error):
+        acks[ack] = (message_id, error)
+
+    writer = MessageWriter(on_commit, max_delay=0.01)
+    asyncio.run(write_all(writer, [
+        (message("hi", sender=["alice"]), [["alice"], "bob"], "bad"),
+        (message("still delivered"), ["alice", "bob"], "good"),
+    ]))
+
+    assert acks["bad"][0] is None and isinstance(acks["bad"][1], TypeError)
+    assert acks["good"][0] is not None and acks["good"][1] is None
+
+
+def test_retry_after_a_landed_commit_writes_nothing_twice(users, monkeypatch):
+    real_commit = repositories.commit
+    attempts = []
+
+    async def commit(batch):
+        attempts.append(batch)
+        await real_commit(batch)
+        if len(attempts) == 1:
+            # The write landed but the response was lost
+            raise DeadlineExceeded("deadline exceeded")
+
+    monkeypatch.setattr(repositories, "commit", commit)
+    acks = {}
+
+    async def on_commit(ack, message_id, error):
+        acks[ack] = (message_id, error)
+
+    writer = MessageWriter(on_commit, max_delay=0.01)
+    asyncio.run(write_all(writer, [(message(f"m{i}"), ["alice", "bob"], i) for i in range(5)]))
+
+    assert len(attempts) == 2
+    stored = {path.split("/")[1] for path in users.docs if path.startswith("messages/")}
+    assert stored == {message_id for message_id, _ in acks.values()}
+    assert len(stored) == 5 and all(error is None for _, error in acks.values())
+    assert users.docs["users/alice"]["messageCount"] == 5
+    assert users.docs["conversations/alice_bob"]["unread"] == {"bob": 5}
+    assert writer.stats()["committed"] == 5
+
+
+def test_unknown_sender_gets_no_user_document(users):
+    acks = {}
+
+    async def on_commit(ack, message_id, error):
+        acks[ack] = (message_id, error)
+
+    writer = MessageWriter(on_commit, max_delay=0.01)
+    asyncio.run(write_all(writer, [
+        (message("hi", sender="mallory"), ["mallory", "bob"], "unknown"),
+        (message("hello"), ["alice", "bob"], "known"),
+    ]))
+
+    assert all(message_id and error is None for message_id, error in acks.values())
+    assert "users/mallory" not in users.docs
+    assert users.docs["users/alice"]["messageCount"] == 1
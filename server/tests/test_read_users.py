@@ -0,0 +1,49 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("socketio")
+
+import main  # noqa: E402
+
+REQUEST = SimpleNamespace(headers={})
+
+
+@pytest.fixture
+def users(db):
+    for i in range(3):
+        db.collection("users").document(f"user-{i}").set({
+            "name": f"User {i}", "email": f"user{i}@example.com", "dailyCounts": {"2026-01-01": {"sessions": 1}},
+        })
+    return db
+
+
+def read(**params):
+    response = asyncio.run(main.read_users(REQUEST, current_user_id="user-0", **params))
+    return json.loads(response.body), response.headers.get("X-Next-Cursor")
+
+
+def test_id_only_projects_onto_the_document_name(users):
+    records, cursor = read(fields="id", limit=2)
+
+    assert users.queries[-1].projection == ["__name__"]
+    assert records == [{"id": "user-0"}, {"id": "user-1"}]
+    assert read(fields="id", cursor=cursor)[0] == [{"id": "user-2"}]
+
+
+def test_sparse_fields_project_onto_the_requested_fields(users):
+    records, _ = read(fields="id,name,name")
+
+    assert users.queries[-1].projection == ["name"]
+    assert records[0] == {"id": "user-0", "name": "User 0"}
+
+
+def test_default_projection_is_the_profile_fields(users):
+    records, _ = read()
+
+    assert users.queries[-1].projection == main.USER_FIELDS
+    assert "dailyCounts" not in records[0]
+    assert records[0]["email"] == "user0@example.com"
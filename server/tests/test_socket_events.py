@@ -0,0 +1,33 @@
+import asyncio
+import contextlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("socketio")
+
+import main  # noqa: E402
+
+
+def test_join_room_enters_the_room_once(db, monkeypatch):
+    sessions = {}
+
+    @contextlib.asynccontextmanager
+    async def session(sid, namespace=None):
+        yield sessions.setdefault(sid, {})
+
+    monkeypatch.setattr(main.sio, "session", session)
+
+    async def run():
+        main.sio.manager.initialize()
+        sid = await main.sio.manager.connect("eio-join", "/")
+        before = await main.presence.room_size("alice_bob")
+        await main.join_room(sid, {"room": "alice_bob"})
+        await main.join_room(sid, {"room": "alice_bob"})
+        participants = [s for s, _ in main.sio.manager.get_participants("/", "alice_bob")]
+        return sid, participants, await main.presence.room_size("alice_bob") - before
+
+    sid, participants, joined = asyncio.run(run())
+
+    assert participants == [sid]
+    assert joined == 1
@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from core.streaming import NDJSON_MEDIA_TYPE, ndjson_response  # noqa: E402
+
+ROWS = 100_000
+
+
+def test_ndjson_response_streams_rows_as_they_are_produced():
+    produced = 0
+    # Rows produced but not yet written to the client, sampled at every body chunk
+    backlog = []
+    lines = 0
+
+    async def rows():
+        nonlocal produced
+        for i in range(ROWS):
+            produced += 1
+            yield {"id": f"user-{i}", "xp": i}
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal lines
+        if message["type"] == "http.response.start":
+            headers = dict(message["headers"])
+            assert headers[b"content-type"].startswith(NDJSON_MEDIA_TYPE.encode())
+        elif message.get("body"):
+            for line in message["body"].decode().splitlines():
+                assert json.loads(line) == {"id": f"user-{lines}", "xp": lines}
+                lines += 1
+            backlog.append(produced - lines)
+
+    response = ndjson_response(rows())
+    asyncio.run(response({"type": "http", "method": "GET", "path": "/"}, receive, send))
+
+    assert lines == ROWS
+    # Each row is written before the next one is pulled from the generator
+    assert max(backlog) == 0
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from core import repositories, user_stats
+from core.user_stats import day_key, session_daily_changes, stage_counters, stale_daily_counts
+
+
+def test_day_key_uses_the_utc_day():
+    ist = timezone(timedelta(hours=5, minutes=30))
+    # 01:00 on the 2nd in India is still the 1st in UTC, which is how Firestore returns it
+    written = datetime(2026, 10, 2, 1, 0, tzinfo=ist)
+    read_back = written.astimezone(timezone.utc)
+    assert day_key(written) == day_key(read_back) == "2026-10-01"
+    assert day_key("2026-10-02T01:00:00+05:30") == "2026-10-01"
+
+
+def test_session_decrement_lands_on_the_increment_day():
+    ist = timezone(timedelta(hours=5, minutes=30))
+    created = {"status": "SCHEDULED", "scheduledAt": datetime(2026, 10, 2, 1, 0, tzinfo=ist)}
+    stored = {**created, "scheduledAt": created["scheduledAt"].astimezone(timezone.utc)}
+    cancelled = {**stored, "status": "CANCELLED"}
+    assert session_daily_changes(None, created) == {"2026-10-01": {"sessions": 1}}
+    assert session_daily_changes(stored, cancelled) == {"2026-10-01": {"sessions": -1}}
+
+
+def test_counters_for_past_days_are_not_stored(db):
+    today = day_key()
+    yesterday = day_key(datetime.now(timezone.utc) - timedelta(days=1))
+    db.docs["users/ada"] = {"name": "Ada", "dailyCounts": {today: {"matches": 1}}}
+    batch = repositories.batch()
+    stage_counters(batch, "ada", daily={today: {"sessions": 1}, yesterday: {"sessions": -1}})
+    batch.commit()
+    assert db.docs["users/ada"]["dailyCounts"] == {today: {"matches": 1, "sessions": 1}}
+
+
+def test_counters_never_create_user_documents(db):
+    db.collection("users").document("ada").set({"name": "Ada"})
+
+    asyncio.run(user_stats.increment(["ada", "ghost", "system"], counters={"completedSessions": 1}))
+
+    assert db.docs["users/ada"] == {"name": "Ada", "completedSessions": 1}
+    assert "users/ghost" not in db.docs
+
+
+def test_stale_buckets_are_pruned_with_a_merge_set(db):
+    today = day_key()
+    old = day_key(datetime.now(timezone.utc) - timedelta(days=40))
+    db.docs["users/ada"] = {"dailyCounts": {old: {"sessions": 2}, today: {"matches": 1}}, "xp": 10}
+
+    stale = stale_daily_counts(db.docs["users/ada"])
+    assert list(stale) == [old]
+    batch = repositories.batch()
+    batch.set(repositories.db.collection("users").document("ada"), {"dailyCounts": stale}, merge=True)
+    batch.commit()
+
+    assert db.docs["users/ada"] == {"dailyCounts": {today: {"matches": 1}}, "xp": 10}
+    assert user_stats.daily_goal_progress(db.docs["users/ada"]) == 1
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from core.xp_ledger import XPLedger, awards_for, level_for, xp_ledger_repo
+
+GAIN = 35
+
+
+def complete(ledger, session_id, participants=("alice", "bob")):
+    return ledger.apply(awards_for(list(participants), "session_completed", {
+        "xp": GAIN, "sessions": 1, "completedSessions": 1,
+    }, source_id=session_id))
+
+
+@pytest.fixture
+def users(db):
+    for uid in ("alice", "bob"):
+        db.collection("users").document(uid).set({"name": uid.title(), "email": f"{uid}@example.com"})
+    return db
+
+
+def test_parallel_completions_lose_no_updates(users):
+    ledger = XPLedger()
+    sessions = [f"session-{i}" for i in range(60)]
+
+    async def run():
+        # Every session completed twice at once, as when both partners press "complete"
+        return await asyncio.gather(*(complete(ledger, s) for s in sessions + sessions))
+
+    applied = asyncio.run(run())
+
+    assert applied.count(True) == len(sessions)
+    for uid in ("alice", "bob"):
+        user = users.collection("users").document(uid).get().to_dict()
+        assert user["xp"] == GAIN * len(sessions)
+        assert user["sessions"] == user["completedSessions"] == len(sessions)
+    assert len(list(xp_ledger_repo.collection.stream())) == 2 * len(sessions)
+
+
+def test_settle_levels_follows_committed_xp(db):
+    ledger = XPLedger()
+    users = db.collection("users")
+    users.document("alice").set({"xp": 90, "level": 1})
+
+    async def run():
+        # Another worker's award lands first: its in-memory view of alice never saw it
+        await ledger.apply(awards_for(["alice"], "session_completed", {"xp": 150}, source_id="elsewhere"))
+        await complete(ledger, "here", ["alice"])
+        return await asyncio.gather(*(ledger.settle_levels(["alice"]) for _ in range(10)))
+
+    results = asyncio.run(run())
+
+    xp = 90 + 150 + GAIN
+    assert users.document("alice").get().to_dict()["level"] == level_for(xp)
+    # Concurrent settles report the raise exactly once
+    assert [r for r in results if r] == [{"alice": level_for(xp)}]
+    assert asyncio.run(ledger.settle_levels(["alice"])) == {}
+
+
+def test_award_for_an_unknown_user_creates_nothing(users):
+    ledger = XPLedger()
+
+    async def run():
+        alone = await complete(ledger, "ghost-session", ["ghost"])
+        # All of a call's awards share one commit: alice gets nothing either
+        together = await complete(ledger, "mixed-session", ["alice", "ghost"])
+        return alone, together
+
+    assert asyncio.run(run()) == (False, False)
+    assert "users/ghost" not in users.docs
+    assert "xp" not in users.docs["users/alice"]
+    assert not list(xp_ledger_repo.collection.stream())